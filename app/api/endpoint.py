@@ -1,23 +1,23 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from app.model.recommender import generate_recommendation_for_user
-from app.config.database import get_engine
-from app.data.loader import (
-    load_user_data,
-    load_brand_data,
-    load_user_brand_data,
-    load_interaction_data,
-    load_bookmark_data,
-)
-from app.features.builder import build_user_features, build_interactions
-from app.model.trainer import prepare_dataset, train_model
-from app.saver.db_saver import save_to_db
-from app.data.loader import load_exclude_brands
-from app.main import main as run_batch
+from app.model.recommender import generate_recommendation_from_artifact
+from app.model.store import reload_model_artifact_if_changed, refresh_model_artifact
+from app.config.database import get_engine, get_async_engine, pool_status
+from app.config.settings import SCORING_WORKERS, SIMILAR_BRANDS_TOP_N
+from app.api.metrics import RECOMMENDATION_STAGE_LATENCY
+from app.data.loader import load_user_context, load_user_recommendations
+from app.data.recommendation_cache import recommendation_cache
+from app.data.catalog import brand_catalog_cache
+from app.features.builder import build_user_features
+from app.saver.db_saver import replace_user_recommendations
+from app.jobs.batch_job import batch_job_runner, read_job_status, BatchAlreadyRunning
 import logging
-from app.features.builder import build_item_features
-from app.saver.db_saver import save_statistics
+from app.saver.db_saver import replace_recommendation_statistics
 from app.utils.statistics import prepare_statistics_df
 
 '''
@@ -28,64 +28,128 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# 점수 계산(CPU 작업)은 이벤트 루프를 막지 않도록 크기가 제한된 전용 스레드 풀에서 실행
+_scoring_executor = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix="scoring")
+_scoring_slots = asyncio.Semaphore(SCORING_WORKERS * 2)
+_catalog_refresh_lock = asyncio.Lock()
+
+def get_db_engine():
+    # 요청마다 엔진을 만들지 않고 프로세스 공유 엔진(커넥션 풀)을 주입
+    try:
+        return get_engine()
+    except Exception as e:
+        logger.error(f"데이터베이스 엔진 생성 실패: {e}")
+        raise HTTPException(status_code=503, detail="데이터베이스 연결 실패") from e
+
+def get_db_async_engine():
+    try:
+        return get_async_engine()
+    except Exception as e:
+        logger.error(f"비동기 데이터베이스 엔진 생성 실패: {e}")
+        raise HTTPException(status_code=503, detail="데이터베이스 연결 실패") from e
+
 class UserRequest(BaseModel):
     user_id: int
 
+async def _run_loader(async_engine, loader, **kwargs):
+    # 쿼리마다 별도 커넥션을 사용해야 동시에 실행됨, 기존 동기 로더는 run_sync 로 그대로 재사용
+    async with async_engine.connect() as conn:
+        return await conn.run_sync(loader, **kwargs)
+
+async def _load_catalog(async_engine):
+    # 카탈로그 갱신은 threading.Lock 을 쥔 채 DB 를 조회하는데, run_sync 는 이벤트 루프 스레드에서 실행되므로
+    # 두 요청이 동시에 갱신하면 두 번째 요청이 루프를 막고 잠금을 기다려 교착 -> 루프 안에서 먼저 한 요청씩 갱신
+    async with _catalog_refresh_lock:
+        catalog = brand_catalog_cache.peek()
+        if catalog is not None:
+            return catalog
+        return await _run_loader(async_engine, brand_catalog_cache.get)
+
+async def load_request_context(async_engine, user_id):
+    # 사용자 컨텍스트는 한 번의 쿼리로 조회, 브랜드 카탈로그는 캐시에서 가져오고
+    # 버전 확인/갱신이 필요할 때만 별도 커넥션에서 동시에 조회
+    catalog = brand_catalog_cache.peek()
+    if catalog is None:
+        user_context, catalog = await asyncio.gather(
+            _run_loader(async_engine, load_user_context, user_id=user_id),
+            _load_catalog(async_engine),
+        )
+    else:
+        user_context = await _run_loader(async_engine, load_user_context, user_id=user_id)
+
+    return {
+        "user_df": user_context["user_df"],
+        "catalog": catalog,
+        "brand_df": catalog.brand_df,
+        "user_brand_df": user_context["user_brand_df"],
+        "bookmark_df": user_context["bookmark_df"],
+        "exclude_brand_ids": set(user_context["exclude_brand_df"]["brand_id"].tolist()),
+    }
+
+def _score_user(user_id, context, artifact):
+    catalog = context["catalog"]
+    exclude_brand_ids = context["exclude_brand_ids"]
+
+    # 사용자 피쳐 구성 (brand -> category 조회표는 카탈로그 캐시 재사용)
+    with RECOMMENDATION_STAGE_LATENCY.labels("feature_build").time():
+        user_feature_map = build_user_features(context["user_brand_df"], context["bookmark_df"], catalog.brand_df,
+                                               exclude_brand_ids, brand_to_category=catalog.brand_to_category)
+
+    # 추천 생성 (배치에서 학습된 모델로 점수 계산, 재학습 없음)
+    with RECOMMENDATION_STAGE_LATENCY.labels("score").time():
+        return generate_recommendation_from_artifact(
+            user_id, user_feature_map.get(user_id, {}), artifact,
+            exclude_brand_ids=exclude_brand_ids, available_brand_ids=catalog.brand_ids
+        )
+
+def _save_results(engine, user_id, recommend_df, brand_df):
+    replace_user_recommendations(engine, user_id, recommend_df)
+
+    statistics_df = prepare_statistics_df(recommend_df, brand_df)
+
+    try:
+        replace_recommendation_statistics(engine, statistics_df, user_id=user_id)
+    except Exception as e:
+        logger.warning(f"추천 통계 저장 중 오류 발생: {e}")
+
 @router.post("/re-recommendation")
-def recommend_on_demand(request_body: UserRequest):
+async def recommend_on_demand(request_body: UserRequest, engine=Depends(get_db_engine),
+                              async_engine=Depends(get_db_async_engine)):
     try:
         user_id = request_body.user_id
-        print(f"[추천 API] 요청 바디에서 받은 user_id: {user_id}")
-
-        # 1. DB 연결
-        try:
-            engine = get_engine()
-            with engine.connect() as conn:
-                user_df = load_user_data(conn, user_ids=[user_id])
-                brand_df = load_brand_data(conn)
-                user_brand_df = load_user_brand_data(conn, user_ids=[user_id])
-                interaction_df = load_interaction_data(conn, user_ids=[user_id])
-                bookmark_df = load_bookmark_data(conn, user_ids=[user_id])
+        logger.debug(f"재추천 요청 user_id={user_id}")
 
-                exclude_brand_df = load_exclude_brands(conn, user_ids=[user_id])
-                exclude_brand_ids = set(exclude_brand_df["brand_id"].tolist())
+        # 다른 워커/배치가 새 모델을 배포했으면 교체 (MODEL_RELOAD_INTERVAL 마다 LATEST 만 확인)
+        artifact = await run_in_threadpool(reload_model_artifact_if_changed)
+        if artifact is None:
+            raise HTTPException(status_code=503, detail="추천 모델이 준비되지 않았습니다.")
 
+        # 1. 사용자 데이터 로드 (쿼리 동시 실행)
+        try:
+            with RECOMMENDATION_STAGE_LATENCY.labels("load_context").time():
+                context = await load_request_context(async_engine, user_id)
         except Exception as e:
             logger.error(f"데이터베이스 연결 또는 데이터 로드 실패: {e}")
             raise HTTPException(status_code=503, detail="데이터베이스 연결 실패") from e
 
-        # 2. 사용자 피쳐 구성
-        user_feature_map = build_user_features(user_brand_df, bookmark_df, brand_df, exclude_brand_ids)
-
-        # 3. dataset 구성
-        item_feature_map = build_item_features(brand_df)
-        dataset = prepare_dataset(user_df, brand_df, user_feature_map, item_feature_map)
-        item_features = dataset.build_item_features([(iid, feats) for iid, feats in item_feature_map.items()])
-        interactions, weights = build_interactions(dataset, interaction_df, user_brand_df, brand_df)
-        user_features = dataset.build_user_features([(uid, feats) for uid, feats in user_feature_map.items()])
-
-        # 4. 모델 학습
-        model = train_model(interactions, weights, user_features, item_features)
+        if context["user_df"].empty:
+            raise HTTPException(status_code=404, detail="추천할 브랜드가 없습니다.")
 
-        # 5. 추천 생성
-        recommend_df = generate_recommendation_for_user(
-            user_id, user_df, brand_df, model, dataset, user_features, item_features, exclude_brand_ids=exclude_brand_ids
-        )
+        # 2. 피처 구성 + 추천 생성 (단계별 지연은 _score_user 안에서 feature_build / score 로 기록)
+        async with _scoring_slots:
+            recommend_df = await asyncio.get_running_loop().run_in_executor(
+                _scoring_executor, _score_user, user_id, context, artifact
+            )
 
         if recommend_df.empty:
             raise HTTPException(status_code=404, detail="추천할 브랜드가 없습니다.")
 
-        # 6. DB 저장
-        save_to_db(engine, recommend_df)
-
-        statistics_df = prepare_statistics_df(recommend_df, brand_df)
-
-        try:
-            save_statistics(engine, statistics_df)
-        except Exception as e:
-            logger.warning(f"추천 통계 저장 중 오류 발생: {e}")
+        # 3. DB 저장 (COPY/execute_values 는 psycopg2 동기 엔진 사용)
+        with RECOMMENDATION_STAGE_LATENCY.labels("save").time():
+            await run_in_threadpool(_save_results, engine, user_id, recommend_df, context["brand_df"])
+        recommendation_cache.invalidate(user_id)
 
-        # 7. 응답 반환
+        # 4. 응답 반환
         return {
             "user_id": user_id,
             "recommendations": recommend_df[["brand_id", "score", "rank"]].to_dict(orient="records")
@@ -97,11 +161,85 @@ def recommend_on_demand(request_body: UserRequest):
         logger.error("추천 생성 중 오류 발생", exc_info=True)
         raise HTTPException(status_code=500, detail="내부 서버 오류가 발생했습니다.") from e
 
+def _on_batch_succeeded(status):
+    # 배치가 배포한 새 모델을 이 워커에 반영하고, 이전 배치 결과 캐시는 비움
+    refresh_model_artifact()
+    recommendation_cache.clear()
+
+@router.get("/recommendations/{user_id}")
+async def get_recommendations(user_id: int, async_engine=Depends(get_db_async_engine)):
+    # 최근 배치(또는 재추천)로 저장된 추천 결과 조회, 캐시 적중 시 DB 조회 없이 저장된 응답 본문을 그대로 반환
+    try:
+        if recommendation_cache.probe_due():
+            await _run_loader(async_engine, recommendation_cache.refresh_generation)
+
+        generation = recommendation_cache.generation
+        body = recommendation_cache.get(user_id)
+        if body is None:
+            recommend_df = await _run_loader(async_engine, load_user_recommendations, user_id=user_id)
+            if recommend_df.empty:
+                raise HTTPException(status_code=404, detail="추천 결과가 없습니다.")
+            body = json.dumps({
+                "user_id": user_id,
+                "recommendations": recommend_df.to_dict(orient="records"),
+            }).encode()
+            recommendation_cache.set(user_id, body, generation=generation)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"추천 결과 조회 실패: {e}")
+        raise HTTPException(status_code=503, detail="데이터베이스 연결 실패") from e
+
+    return Response(content=body, media_type="application/json")
+
 @router.post("/trigger-batch")
 def trigger_batch():
+    # 배치는 별도 프로세스에서 실행하고 job_id 만 즉시 반환 (진행 상황은 /batch-jobs/{job_id} 로 조회)
     try:
-        run_batch()
-        return JSONResponse(status_code=200, content={"message": "Batch recommendation process executed successfully."})
+        job_id = batch_job_runner.start(on_success=_on_batch_succeeded)
+    except BatchAlreadyRunning as e:
+        return JSONResponse(status_code=409, content={"message": "Batch recommendation process is already running.",
+                                                      "job_id": e.job_id})
     except Exception as e:
         logger.error("배치 실행 중 오류 발생", exc_info=True)
-        raise HTTPException(status_code=500, detail="배치 실행 실패") from e
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="배치 실행 실패") from e
+
+    return JSONResponse(status_code=202, content={
+        "message": "Batch recommendation process started.",
+        "job_id": job_id,
+        "status_url": f"/batch-jobs/{job_id}",
+    })
+
+@router.get("/batch-jobs/{job_id}")
+def batch_job_status(job_id: str):
+    status = read_job_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="배치 작업을 찾을 수 없습니다.")
+    status.pop("traceback", None)
+    return status
+
+@router.get("/brands/{brand_id}/similar")
+def similar_brands(brand_id: int, limit: int = Query(10, ge=1, le=SIMILAR_BRANDS_TOP_N)):
+    # 배치가 모델 아티팩트에 함께 저장한 유사 브랜드 표에서 조회 (사용자 피처/DB 조회 없음)
+    artifact = reload_model_artifact_if_changed()
+    if artifact is None:
+        raise HTTPException(status_code=503, detail="추천 모델이 준비되지 않았습니다.")
+    try:
+        similar = artifact.similar_brands(brand_id, limit)
+    except LookupError as e:
+        raise HTTPException(status_code=503, detail="유사 브랜드 정보가 없는 모델입니다.") from e
+    if similar is None:
+        raise HTTPException(status_code=404, detail="브랜드를 찾을 수 없습니다.")
+    return {"brand_id": brand_id, "model_version": artifact.version, "similar_brands": similar}
+
+@router.get("/status/db-pool")
+def db_pool_status():
+    return pool_status()
+
+@router.get("/status/brand-catalog")
+def brand_catalog_status():
+    return brand_catalog_cache.stats()
+
+@router.get("/status/recommendation-cache")
+def recommendation_cache_status():
+    return recommendation_cache.stats()
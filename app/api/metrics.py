@@ -0,0 +1,157 @@
+import json
+import os
+import time
+from datetime import datetime
+from fastapi import APIRouter, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+from prometheus_client.core import REGISTRY, CounterMetricFamily, GaugeMetricFamily
+from app.config.database import pool_status
+from app.config.settings import BATCH_REPORT_DIR
+from app.data.catalog import brand_catalog_cache
+from app.data.recommendation_cache import recommendation_cache
+from app.model.store import get_model_artifact
+
+'''
+Prometheus 메트릭 (/metrics)
+
+- 요청 지연: 라우트(경로 템플릿)/메서드/상태 코드별 히스토그램
+- /re-recommendation 단계별 지연: 컨텍스트 조회(load_context) / 피처 구성(feature_build) / 점수 계산(score) / 저장(save)
+- 스크레이프 시점에 읽는 상태 값: 브랜드 카탈로그/추천 결과 캐시 적중, DB 커넥션 풀(동기/비동기), 모델 버전/나이, 최근 배치 실행 리포트
+  (배치는 별도 프로세스에서 실행되므로 BATCH_REPORT_DIR/latest.json 에서 읽음)
+'''
+
+router = APIRouter()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP 요청 처리 시간",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+RECOMMENDATION_STAGE_LATENCY = Histogram(
+    "re_recommendation_stage_duration_seconds", "/re-recommendation 단계별 처리 시간",
+    ["stage"], buckets=LATENCY_BUCKETS,
+)
+
+def _version_time(version):
+    # 모델 버전: <YYYYmmddHHMMSS>-<임의 접미어>
+    try:
+        return datetime.strptime(version[:14], "%Y%m%d%H%M%S")
+    except (TypeError, ValueError):
+        return None
+
+def _read_latest_report():
+    try:
+        with open(os.path.join(BATCH_REPORT_DIR, "latest.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+class _StateCollector:
+    def _cache_metrics(self):
+        stats = brand_catalog_cache.stats()
+        hits = CounterMetricFamily("brand_catalog_cache_hits", "브랜드 카탈로그 캐시 적중 수")
+        hits.add_metric([], stats["hits"])
+        misses = CounterMetricFamily("brand_catalog_cache_misses", "브랜드 카탈로그 캐시 미스(재조회) 수")
+        misses.add_metric([], stats["misses"])
+        probes = CounterMetricFamily("brand_catalog_cache_probes", "브랜드 카탈로그 버전 조회 수")
+        probes.add_metric([], stats["probes"])
+        return [hits, misses, probes]
+
+    def _recommendation_cache_metrics(self):
+        stats = recommendation_cache.stats()
+        hits = CounterMetricFamily("recommendation_cache_hits", "추천 결과 캐시 적중 수")
+        hits.add_metric([], stats["hits"])
+        misses = CounterMetricFamily("recommendation_cache_misses", "추천 결과 캐시 미스(DB 조회) 수")
+        misses.add_metric([], stats["misses"])
+        invalidations = CounterMetricFamily("recommendation_cache_invalidations", "추천 결과 캐시 무효화 수")
+        invalidations.add_metric([], stats["invalidations"])
+        metrics = [hits, misses, invalidations]
+        if stats["size"] is not None:
+            size = GaugeMetricFamily("recommendation_cache_size", "추천 결과 캐시 항목 수")
+            size.add_metric([], stats["size"])
+            metrics.append(size)
+        return metrics
+
+    def _pool_metrics(self):
+        # pool 라벨: sync (저장/배치, psycopg2) / async (API 조회, asyncpg)
+        checkouts = CounterMetricFamily("db_pool_checkouts", "커넥션 체크아웃 수", labels=["pool"])
+        timeouts = CounterMetricFamily("db_pool_checkout_timeouts", "커넥션 체크아웃 타임아웃 수", labels=["pool"])
+        wait = CounterMetricFamily("db_pool_checkout_wait_seconds", "커넥션 체크아웃 대기 시간 합계", labels=["pool"])
+        gauges = {key: GaugeMetricFamily(f"db_pool_{key}", f"커넥션 풀 {key}", labels=["pool"])
+                  for key in ["pool_size", "checked_out", "checked_in", "overflow"]}
+
+        for name, status in pool_status().items():
+            checkouts.add_metric([name], status["checkouts_total"])
+            timeouts.add_metric([name], status["checkout_timeouts_total"])
+            wait.add_metric([name], status["checkout_wait_seconds_total"])
+            for key, gauge in gauges.items():
+                if key in status:
+                    gauge.add_metric([name], status[key])
+        return [checkouts, timeouts, wait, *gauges.values()]
+
+    def _model_metrics(self):
+        artifact = get_model_artifact()
+        loaded = GaugeMetricFamily("model_loaded", "추천 모델 로드 여부")
+        loaded.add_metric([], 0 if artifact is None else 1)
+        if artifact is None:
+            return [loaded]
+
+        info = GaugeMetricFamily("model_info", "현재 추천 모델 버전", labels=["version"])
+        info.add_metric([artifact.version], 1)
+        metrics = [loaded, info]
+
+        trained_at = artifact.trained_until or _version_time(artifact.version)
+        if trained_at is not None:
+            age = GaugeMetricFamily("model_age_seconds", "현재 모델 학습 데이터 기준 시각 이후 경과 시간")
+            age.add_metric([], max(0.0, time.time() - trained_at.timestamp()))
+            metrics.append(age)
+        return metrics
+
+    def _batch_metrics(self):
+        report = _read_latest_report()
+        if report is None:
+            return []
+
+        success = GaugeMetricFamily("batch_last_run_success", "최근 배치 성공 여부")
+        success.add_metric([], 1 if report["status"] == "SUCCEEDED" else 0)
+        finished = GaugeMetricFamily("batch_last_run_finished_timestamp_seconds", "최근 배치 종료 시각")
+        finished.add_metric([], datetime.fromisoformat(report["finished_at"]).timestamp())
+        duration = GaugeMetricFamily("batch_last_run_duration_seconds", "최근 배치 전체 소요 시간")
+        duration.add_metric([], report["seconds"])
+        peak_rss = GaugeMetricFamily("batch_last_run_peak_rss_bytes", "최근 배치 최대 RSS")
+        peak_rss.add_metric([], report["peak_rss_mb"] * 1024 ** 2)
+
+        stage_seconds = GaugeMetricFamily("batch_last_run_stage_duration_seconds", "최근 배치 단계별 소요 시간", labels=["stage"])
+        stage_cpu = GaugeMetricFamily("batch_last_run_stage_cpu_seconds", "최근 배치 단계별 CPU 시간", labels=["stage"])
+        for stage in report.get("stages", []):
+            stage_seconds.add_metric([stage["name"]], stage.get("seconds") or 0.0)
+            stage_cpu.add_metric([stage["name"]], stage.get("cpu_seconds") or 0.0)
+        return [success, finished, duration, peak_rss, stage_seconds, stage_cpu]
+
+    def collect(self):
+        yield from self._cache_metrics()
+        yield from self._recommendation_cache_metrics()
+        yield from self._pool_metrics()
+        yield from self._model_metrics()
+        yield from self._batch_metrics()
+
+REGISTRY.register(_StateCollector())
+
+async def metrics_middleware(request: Request, call_next):
+    # 경로 파라미터로 라벨이 늘어나지 않도록 실제 경로 대신 라우트 템플릿 사용
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            request.method, route.path if route is not None else "unmatched", str(status)
+        ).observe(time.perf_counter() - start)
+
+@router.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
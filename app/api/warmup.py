@@ -0,0 +1,90 @@
+import time
+import asyncio
+import logging
+import numpy as np
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import text
+from app.config.database import get_engine, get_async_engine
+from app.data.catalog import brand_catalog_cache
+from app.model.recommender import generate_recommendation_from_artifact
+from app.model.store import refresh_model_artifact
+
+'''
+API 서버 시작 준비(warmup)와 readiness 확인 (/status/ready)
+
+lifespan 에서 모델 아티팩트와 브랜드 카탈로그를 미리 로드하고, 존재하지 않는 사용자로 추천 한 번을 계산해
+점수 계산 경로(피처 행 구성, mmap 페이지, numpy/scipy 연산)를 데운 뒤에 ready 로 표시한다.
+모델이나 DB 가 없어도 서버는 뜨고(배치로 모델 생성 가능), 준비 결과는 /status/ready 응답에 단계별로 남긴다.
+'''
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# 학습 데이터에 없는 사용자 id (identity 피처 없이 빈 피처로 점수 계산)
+_WARMUP_USER_ID = -1
+
+_state = {"ready": False, "steps": {}}
+
+async def _step(name, fn, *args):
+    # 동기 단계는 스레드 풀에서 실행, 실패해도 다음 단계로 진행
+    start = time.perf_counter()
+    try:
+        if asyncio.iscoroutinefunction(fn):
+            result = await fn(*args)
+        else:
+            result = await run_in_threadpool(fn, *args)
+        status = "ok"
+    except Exception as e:
+        logger.warning(f"warmup 단계 실패 ({name}): {e}")
+        result, status = None, "failed"
+    _state["steps"][name] = {"status": status, "seconds": round(time.perf_counter() - start, 4)}
+    return result
+
+def _load_model():
+    try:
+        return refresh_model_artifact()
+    except FileNotFoundError as e:
+        logger.warning(f"모델 아티팩트를 찾을 수 없어 배치 실행 전까지 추천이 비활성화됩니다: {e}")
+        return None
+
+def _load_catalog():
+    with get_engine().connect() as conn:
+        return brand_catalog_cache.get(conn)
+
+async def _connect_async_pool():
+    # 요청 경로의 컨텍스트 조회는 비동기 엔진을 사용하므로 커넥션 하나를 미리 연결
+    async with get_async_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+def _dummy_prediction(artifact, catalog):
+    available_brand_ids = catalog.brand_ids if catalog is not None else np.asarray(artifact.id_index.brand_ids)
+    return generate_recommendation_from_artifact(_WARMUP_USER_ID, {}, artifact, available_brand_ids=available_brand_ids)
+
+async def warm_up():
+    start = time.perf_counter()
+
+    artifact = await _step("model", _load_model)
+    if artifact is not None:
+        _state["steps"]["model"].update(version=artifact.version, format=type(artifact).__name__)
+
+    catalog = await _step("brand_catalog", _load_catalog)
+    if catalog is not None:
+        _state["steps"]["brand_catalog"]["brands"] = len(catalog.brand_df)
+
+    await _step("async_pool", _connect_async_pool)
+
+    if artifact is not None:
+        await _step("dummy_prediction", _dummy_prediction, artifact, catalog)
+
+    _state["seconds"] = round(time.perf_counter() - start, 4)
+    _state["ready"] = True
+    logger.info(f"🔥 warmup 완료 ({_state['seconds']}s): "
+                + ", ".join(f"{name}={step['status']}" for name, step in _state["steps"].items()))
+    return _state
+
+@router.get("/status/ready")
+def readiness():
+    return JSONResponse(status_code=200 if _state["ready"] else 503, content=_state)
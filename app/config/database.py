@@ -1,14 +1,78 @@
 import os
+import time
+import threading
 from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from dotenv import load_dotenv
 
 '''
 환경 설정, DB 연결 구성
+
+엔진(커넥션 풀)은 프로세스당 하나만 만들어 API 핸들러와 배치가 함께 사용한다.
+API 프로세스는 요청 경로 조회용 비동기 풀과 저장(COPY)용 동기 풀을 함께 쓰므로,
+configure_api_pools() 로 프로세스당 커넥션 예산(DB_POOL_SIZE + DB_MAX_OVERFLOW)을 두 풀에 나눈다.
 '''
 
 load_dotenv()
 
-def get_engine():
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# API 프로세스에서 비동기 풀에 주는 몫, 동기 풀은 나머지 (DB_POOL_SIZE - ASYNC_DB_POOL_SIZE, 최소 1)
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", str(max(1, DB_POOL_SIZE - 1))))
+ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", str(DB_MAX_OVERFLOW // 2)))
+
+_engine = None
+_async_engine = None
+_engine_lock = threading.Lock()
+_sync_pool_budget = (DB_POOL_SIZE, DB_MAX_OVERFLOW)
+
+
+class _PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def observe(self, wait_seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+
+pool_stats = _PoolStats()
+async_pool_stats = _PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    # 커넥션 체크아웃 대기 시간을 기록하는 QueuePool
+    stats = pool_stats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.stats.observe(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.observe(time.perf_counter() - start)
+        return connection
+
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    # 비동기 엔진(asyncpg)용, 체크아웃 대기 시간은 async_pool_stats 에 따로 기록
+    stats = async_pool_stats
+
+
+def _database_url(driver="postgresql"):
     db_user = os.getenv("DB_USER")
     db_pass = os.getenv("DB_PASSWORD")
     db_host = os.getenv("DB_HOST")
@@ -18,5 +82,85 @@ def get_engine():
     if not all([db_user, db_pass, db_host, db_port, db_name]):
         raise ValueError("필수 환경변수가 누락되었습니다.")
 
-    db_url = f"postgresql://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}"
-    return create_engine(db_url)
\ No newline at end of file
+    return f"{driver}://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}"
+
+def configure_api_pools():
+    # API 프로세스: 동기 풀(저장)은 커넥션 예산에서 비동기 풀(조회) 몫을 뺀 나머지만 사용
+    global _sync_pool_budget
+    if ASYNC_DB_POOL_SIZE < 1 or ASYNC_DB_MAX_OVERFLOW < 0 or ASYNC_DB_MAX_OVERFLOW > DB_MAX_OVERFLOW:
+        raise ValueError("ASYNC_DB_POOL_SIZE / ASYNC_DB_MAX_OVERFLOW 가 커넥션 예산(DB_POOL_SIZE, DB_MAX_OVERFLOW)을 벗어납니다.")
+    _sync_pool_budget = (max(1, DB_POOL_SIZE - ASYNC_DB_POOL_SIZE), DB_MAX_OVERFLOW - ASYNC_DB_MAX_OVERFLOW)
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                pool_size, max_overflow = _sync_pool_budget
+                _engine = create_engine(
+                    _database_url(),
+                    poolclass=TimedQueuePool,
+                    pool_size=pool_size,
+                    max_overflow=max_overflow,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_pre_ping=True,
+                )
+    return _engine
+
+def get_async_engine():
+    # API 요청 경로용 비동기 엔진 (asyncpg), ASYNC_DB_URL 로 다른 Postgres 호환 DB 를 지정할 수 있음
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        with _engine_lock:
+            if _async_engine is None:
+                _async_engine = create_async_engine(
+                    os.getenv("ASYNC_DB_URL") or _database_url("postgresql+asyncpg"),
+                    poolclass=TimedAsyncQueuePool,
+                    pool_size=ASYNC_DB_POOL_SIZE,
+                    max_overflow=ASYNC_DB_MAX_OVERFLOW,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_pre_ping=True,
+                )
+    return _async_engine
+
+async def dispose_async_engine():
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
+def dispose_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+def _pool_status(engine, stats):
+    status = {
+        "checkouts_total": stats.checkouts,
+        "checkout_timeouts_total": stats.timeouts,
+        "checkout_wait_seconds_total": round(stats.wait_seconds_total, 6),
+        "checkout_wait_seconds_max": round(stats.wait_seconds_max, 6),
+    }
+    if engine is not None:
+        pool = engine.pool
+        status.update({
+            "pool_size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+        })
+    return status
+
+def pool_status():
+    # sync: 배치/저장용 psycopg2 풀, async: API 요청 경로 조회용 asyncpg 풀
+    return {
+        "sync": _pool_status(_engine, pool_stats),
+        "async": _pool_status(_async_engine.sync_engine if _async_engine is not None else None, async_pool_stats),
+    }
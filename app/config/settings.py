@@ -0,0 +1,123 @@
+import os
+import math
+from dotenv import load_dotenv
+
+'''
+배치 학습 관련 설정
+'''
+
+load_dotenv()
+
+# full: 매 배치 전체 이력으로 새로 학습 / incremental: 이전 모델을 이어서 신규 데이터만 학습
+TRAIN_MODE = os.getenv("TRAIN_MODE", "full").lower()
+INCREMENTAL_EPOCHS = int(os.getenv("INCREMENTAL_EPOCHS", "5"))
+
+# 검증 세트 기반 조기 종료 (full 학습에서 사용)
+EARLY_STOPPING = os.getenv("EARLY_STOPPING", "true").lower() == "true"
+MAX_EPOCHS = int(os.getenv("MAX_EPOCHS", "100"))
+EPOCH_CHUNK = int(os.getenv("EPOCH_CHUNK", "5"))
+VALIDATION_RATIO = float(os.getenv("VALIDATION_RATIO", "0.1"))
+EARLY_STOPPING_METRIC = os.getenv("EARLY_STOPPING_METRIC", "precision")
+EARLY_STOPPING_MIN_DELTA = float(os.getenv("EARLY_STOPPING_MIN_DELTA", "0.001"))
+EARLY_STOPPING_PATIENCE = int(os.getenv("EARLY_STOPPING_PATIENCE", "2"))
+# 조기 종료로 정한 best epoch 만큼 전체 인터랙션(검증 세트 포함)으로 다시 학습해 배포 (false 면 학습 세트로 학습한 모델 그대로 사용)
+EARLY_STOPPING_REFIT = os.getenv("EARLY_STOPPING_REFIT", "true").lower() == "true"
+
+
+def _cgroup_cpu_limit():
+    # 컨테이너 CPU quota (cgroup v2: cpu.max, v1: cfs_quota_us / cfs_period_us), 제한이 없으면 None
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return float(quota) / float(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = float(f.read().strip())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = float(f.read().strip())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+def resolve_num_threads(value="auto"):
+    # "auto": cgroup CPU 제한 -> 프로세스에 할당된 CPU 수 순서로 결정
+    if str(value).lower() != "auto":
+        return max(1, int(value))
+
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:
+        available = os.cpu_count() or 1
+
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        available = min(available, math.ceil(limit))
+    return max(1, available)
+
+# LightFM 학습/평가 스레드 수 (정수 또는 auto)
+NUM_THREADS = resolve_num_threads(os.getenv("NUM_THREADS", "auto"))
+
+# API 요청의 추천 점수 계산(피처 구성 + 행렬 연산)을 실행하는 스레드 수
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", "4"))
+
+# 배치 추천 점수 계산 프로세스 수 (1 이면 단일 프로세스, auto 는 NUM_THREADS 와 같은 방식으로 결정)
+SCORING_PROCESSES = resolve_num_threads(os.getenv("SCORING_PROCESSES", "1"))
+
+# 모델 아티팩트 저장 위치
+MODEL_DIR = os.getenv("MODEL_DIR", "artifacts/model")
+# API 워커가 LATEST 포인터를 다시 확인하는 주기(초), 다른 워커/배치가 배포한 모델을 반영
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "10"))
+# 로드 시 배열 파일 전체의 sha256 을 manifest 와 대조 (파일 전체를 읽으므로 기본은 크기/shape 검사만)
+MODEL_VERIFY_CHECKSUM = os.getenv("MODEL_VERIFY_CHECKSUM", "false").lower() == "true"
+# 보관할 모델 버전 수 (LATEST 포함), 삭제된 버전을 mmap 으로 열고 있던 워커는 파일이 닫힐 때까지 그대로 사용
+MODEL_KEEP_VERSIONS = int(os.getenv("MODEL_KEEP_VERSIONS", "3"))
+
+# 모델 아티팩트에 함께 저장하는 브랜드별 유사 브랜드(아이템 임베딩 코사인 유사도) 개수
+SIMILAR_BRANDS_TOP_N = int(os.getenv("SIMILAR_BRANDS_TOP_N", "20"))
+
+# 브랜드 카탈로그 캐시: 버전 확인 주기(초)와 변경이 없어도 다시 읽는 최대 보관 시간(초)
+BRAND_CATALOG_PROBE_INTERVAL = float(os.getenv("BRAND_CATALOG_PROBE_INTERVAL", "30"))
+BRAND_CATALOG_TTL = float(os.getenv("BRAND_CATALOG_TTL", "3600"))
+
+# GET /recommendations 캐시: 백엔드(local = 프로세스 내 LRU), 최대 사용자 수, 항목 유효 시간(초),
+# 배치 공개(run_id) 확인 주기(초)
+RECOMMENDATION_CACHE_BACKEND = os.getenv("RECOMMENDATION_CACHE_BACKEND", "local")
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "100000"))
+RECOMMENDATION_CACHE_TTL = float(os.getenv("RECOMMENDATION_CACHE_TTL", "300"))
+RECOMMENDATION_CACHE_PROBE_INTERVAL = float(os.getenv("RECOMMENDATION_CACHE_PROBE_INTERVAL", "5"))
+
+# timestamp(시간대 없음) 컬럼에 저장할 시각의 시간대 (비어 있으면 프로세스 로컬 시간대, 예: Asia/Seoul)
+DB_TIMEZONE = os.getenv("DB_TIMEZONE", "")
+
+# 결과 저장: 이 행 수 이상이면 COPY 사용, COPY 버퍼 하나에 담는 최대 행 수 (CSV 버퍼 메모리 상한)
+BULK_COPY_MIN_ROWS = int(os.getenv("BULK_COPY_MIN_ROWS", "1000"))
+COPY_CHUNK_ROWS = int(os.getenv("COPY_CHUNK_ROWS", "200000"))
+
+# 추천 스냅샷 교체: 롤백용으로 남길 직전 실행 수와 테이블 교체 시 잠금 대기 한도
+KEEP_RECOMMENDATION_RUNS = int(os.getenv("KEEP_RECOMMENDATION_RUNS", "3"))
+RECOMMENDATION_SWAP_LOCK_TIMEOUT = os.getenv("RECOMMENDATION_SWAP_LOCK_TIMEOUT", "30s")
+
+# 백그라운드 배치 작업 상태 파일/잠금 파일 위치와 보관할 작업 상태 개수
+BATCH_JOB_DIR = os.getenv("BATCH_JOB_DIR", "artifacts/jobs")
+BATCH_JOB_KEEP = int(os.getenv("BATCH_JOB_KEEP", "20"))
+
+# 여러 호스트/레플리카 사이에서 배치를 하나만 실행하기 위한 Postgres advisory lock 키
+BATCH_ADVISORY_LOCK_KEY = int(os.getenv("BATCH_ADVISORY_LOCK_KEY", "5548797501"))
+
+# 배치 실행 리포트(단계별 시간/CPU/메모리/행 수) 저장 위치
+BATCH_REPORT_DIR = os.getenv("BATCH_REPORT_DIR", "artifacts/reports")
+
+# 스트리밍 배치: 학습 후 추천 생성/저장을 사용자 shard 단위로 나눠 메모리 사용량을 일정하게 유지
+BATCH_STREAMING = os.getenv("BATCH_STREAMING", "false").lower() == "true"
+BATCH_SHARD_SIZE = int(os.getenv("BATCH_SHARD_SIZE", "5000"))
+
+# 시간 기준 분할 오프라인 평가(app.offline_evaluation) 리포트 저장 위치
+OFFLINE_EVAL_REPORT_DIR = os.getenv("OFFLINE_EVAL_REPORT_DIR", "artifacts/evaluations")
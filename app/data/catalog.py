@@ -0,0 +1,123 @@
+import time
+import logging
+import threading
+from sqlalchemy import text
+from app.config.settings import BRAND_CATALOG_TTL, BRAND_CATALOG_PROBE_INTERVAL
+from app.data.loader import load_brand_data
+from app.features.builder import brand_category_lookup
+
+'''
+브랜드 카탈로그 인메모리 캐시
+
+브랜드/카테고리 정보는 거의 바뀌지 않으므로 API 요청마다 전체 조회하지 않고
+brand_df, 브랜드 id 배열, brand -> category 조회표를 프로세스 메모리에 보관한다.
+(아이템 점수 계산은 모델 아티팩트에 저장된 아이템 표현을 사용하므로 아이템 피처는 보관하지 않음)
+BRAND_CATALOG_PROBE_INTERVAL 마다 가벼운 버전 조회(브랜드/카테고리 수와 최대 id)로 추가/삭제 여부를 확인하고,
+변경되었거나 BRAND_CATALOG_TTL 이 지나면 다시 읽는다. (기존 행의 수정은 버전에 드러나지 않으므로 TTL 이후 반영)
+'''
+
+logger = logging.getLogger(__name__)
+
+# 스키마에 항상 있는 컬럼(id)만 사용
+VERSION_QUERY = """
+    SELECT
+        (SELECT count(*) FROM brands),
+        (SELECT max(id) FROM brands),
+        (SELECT count(*) FROM categories),
+        (SELECT max(id) FROM categories)
+"""
+
+class BrandCatalog:
+    def __init__(self, brand_df, version=None):
+        self.brand_df = brand_df
+        self.version = version
+        self.loaded_at = time.time()
+        self.brand_ids = brand_df["brand_id"].to_numpy()
+        self.brand_to_category = brand_category_lookup(brand_df)
+        # 조회표 인덱스의 해시 테이블은 첫 조회 때 만들어지며 스레드 안전하지 않으므로, 점수 계산 스레드들이 공유하기 전에 구성
+        self.brand_to_category.index.is_unique
+
+class BrandCatalogCache:
+    def __init__(self, ttl=BRAND_CATALOG_TTL, probe_interval=BRAND_CATALOG_PROBE_INTERVAL):
+        self.ttl = ttl
+        self.probe_interval = probe_interval
+        self._catalog = None
+        self._next_probe_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.probes = 0
+        self._probe_failed = False
+
+    def peek(self):
+        # 버전 확인 주기 안이면 DB 없이 바로 반환, 확인이 필요하면 None (get 으로 조회)
+        catalog = self._catalog
+        if catalog is None or time.monotonic() >= self._next_probe_at:
+            return None
+        self.hits += 1
+        return catalog
+
+    def get(self, conn):
+        catalog = self.peek()
+        if catalog is not None:
+            return catalog
+
+        with self._lock:
+            # 다른 스레드가 먼저 갱신했으면 그 결과 사용
+            catalog = self.peek()
+            if catalog is not None:
+                return catalog
+
+            catalog = self._catalog
+            version = self._probe(conn)
+            expired = catalog is None or time.time() - catalog.loaded_at >= self.ttl
+            if expired or (version is not None and version != catalog.version):
+                catalog = BrandCatalog(load_brand_data(conn), version)
+                self._catalog = catalog
+                self.misses += 1
+                logger.info(f"🏷️ 브랜드 카탈로그 갱신 ({len(catalog.brand_df)}개, version={version})")
+            else:
+                self.hits += 1
+
+            self._next_probe_at = time.monotonic() + self.probe_interval
+            return catalog
+
+    def _probe(self, conn):
+        self.probes += 1
+        try:
+            # 실패해도 이어지는 카탈로그 조회가 가능하도록 savepoint 안에서 실행
+            with conn.begin_nested():
+                version = tuple(conn.execute(text(VERSION_QUERY)).fetchone())
+        except Exception as e:
+            # 버전 조회가 불가능하면 TTL 기준으로만 갱신, 경고는 실패가 시작될 때 한 번만
+            if not self._probe_failed:
+                logger.warning(f"브랜드 카탈로그 버전 조회 실패, 복구될 때까지 TTL 기준으로만 갱신합니다: {e}")
+            else:
+                logger.debug(f"브랜드 카탈로그 버전 조회 실패: {e}")
+            self._probe_failed = True
+            return None
+
+        if self._probe_failed:
+            logger.info("브랜드 카탈로그 버전 조회 복구")
+            self._probe_failed = False
+        return version
+
+    def invalidate(self):
+        with self._lock:
+            self._catalog = None
+            self._next_probe_at = 0.0
+
+    def stats(self):
+        catalog = self._catalog
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "probes": self.probes,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+            "brands": len(catalog.brand_df) if catalog is not None else 0,
+            "version": [str(v) for v in catalog.version] if catalog is not None and catalog.version else None,
+            "age_seconds": round(time.time() - catalog.loaded_at, 1) if catalog is not None else None,
+        }
+
+brand_catalog_cache = BrandCatalogCache()
@@ -1,3 +1,5 @@
+import json
+import numpy as np
 import pandas as pd
 from sqlalchemy import text
 
@@ -16,6 +18,15 @@ def load_user_data(conn, user_ids=None):
 
     return pd.DataFrame(result.fetchall(), columns=["user_id", "gender", "age_range"])
 
+def iter_user_shards(conn, shard_size):
+    # 서버 측 커서로 사용자를 shard_size 명씩 읽음 (전체 사용자를 한 번에 메모리에 올리지 않음)
+    result = conn.execute(
+        text("SELECT id, gender, age_range FROM users ORDER BY id"),
+        execution_options={"stream_results": True, "yield_per": shard_size}
+    )
+    for rows in result.partitions(shard_size):
+        yield pd.DataFrame(rows, columns=["user_id", "gender", "age_range"])
+
 # def load_brand_data(conn):
 #     return pd.DataFrame(conn.execute(text(
 #         "SELECT id, brand_name, category_id FROM brands"
@@ -56,7 +67,7 @@ def load_user_brand_data(conn, user_ids=None):
         result = conn.execute(text(base_query))
     return pd.DataFrame(result.fetchall(), columns=["user_id", "brand_id", "data_type"])
 
-def load_interaction_data(conn, user_ids=None):
+def load_interaction_data(conn, user_ids=None, since=None):
     base_query = """
         SELECT al.user_id, b.id AS brand_id, al.action_type
         FROM action_logs al
@@ -67,17 +78,26 @@ def load_interaction_data(conn, user_ids=None):
         WHERE al.action_type IN ('MARKER_CLICK', 'FILTER_USED')
           AND rbd.id IS NULL
     """
+    params = {}
     if user_ids is not None and len(user_ids) > 0:
         placeholder = ','.join([f':id{i}' for i in range(len(user_ids))])
         base_query += f" AND al.user_id IN ({placeholder})"
         params = {f'id{i}': uid for i, uid in enumerate(user_ids)}
-        result = conn.execute(text(base_query), params)
-    else:
-        result = conn.execute(text(base_query))
+    # 증분 학습용: 지난 배치 이후 발생한 로그만
+    if since is not None:
+        base_query += " AND al.created_at >= :since"
+        params["since"] = since
+
+    result = conn.execute(text(base_query), params)
 
     interaction_raw = pd.DataFrame(result.fetchall(), columns=["user_id", "brand_id", "action_type"])
-    action_weights = {"MARKER_CLICK": 0.5, "FILTER_USED": 0.3}
-    interaction_raw["weight"] = interaction_raw["action_type"].map(action_weights)
+    return aggregate_action_logs(interaction_raw)
+
+ACTION_WEIGHTS = {"MARKER_CLICK": 0.5, "FILTER_USED": 0.3}
+
+def aggregate_action_logs(interaction_raw):
+    # 행동 유형별 가중치를 (user, brand) 단위로 합산
+    interaction_raw = interaction_raw.assign(weight=interaction_raw["action_type"].map(ACTION_WEIGHTS))
     return interaction_raw.groupby(["user_id", "brand_id"])["weight"].sum().reset_index()
 
 def load_bookmark_data(conn, user_ids=None):
@@ -113,4 +133,124 @@ def load_exclude_brands(conn, user_ids=None):
         params = {f'id{i}': uid for i, uid in enumerate(user_ids)}
 
     result = conn.execute(text(base_query), params)
-    return pd.DataFrame(result.fetchall(), columns=["user_id", "brand_id"])
\ No newline at end of file
+    return pd.DataFrame(result.fetchall(), columns=["user_id", "brand_id"])
+
+def load_user_recommendations(conn, user_id):
+    # 현재 공개된 추천 결과 조회 (recommendation.user_id 인덱스 사용)
+    result = conn.execute(
+        text("SELECT brand_id, score, rank FROM recommendation WHERE user_id = :user_id ORDER BY rank"),
+        {"user_id": user_id}
+    )
+    return pd.DataFrame(result.fetchall(), columns=["brand_id", "score", "rank"])
+
+def load_live_recommendation_run(conn):
+    # 스냅샷 교체(app/saver/snapshot.py)로 공개된 배치 실행 id, 교체 이력이 없으면 None
+    return conn.execute(text("SELECT run_id FROM recommendation_runs WHERE status = 'LIVE'")).scalar()
+
+def load_timed_action_logs(conn):
+    # 오프라인 평가(시간 기준 분할)용: 집계 전 행동 로그와 발생 시각
+    result = conn.execute(text("""
+        SELECT al.user_id, b.id AS brand_id, al.action_type, al.created_at
+        FROM action_logs al
+        JOIN store s ON al.store_id = s.id
+        JOIN brands b ON s.brand_id = b.id
+        LEFT JOIN recommendation_base_data rbd 
+          ON al.user_id = rbd.user_id AND b.id = rbd.brand_id AND rbd.data_type = 'EXCLUDE'
+        WHERE al.action_type IN ('MARKER_CLICK', 'FILTER_USED')
+          AND rbd.id IS NULL
+    """))
+    return pd.DataFrame(result.fetchall(), columns=["user_id", "brand_id", "action_type", "created_at"])
+
+def load_timed_visits(conn):
+    # 오프라인 평가용: 방문 이력과 방문 시각 (load_user_brand_data 의 RECENT 원본)
+    result = conn.execute(text("""
+        SELECT h.user_id, h.brand_id, h.visited_at
+        FROM history h
+        LEFT JOIN recommendation_base_data rbd 
+          ON h.user_id = rbd.user_id AND h.brand_id = rbd.brand_id AND rbd.data_type = 'EXCLUDE'
+        WHERE h.visited_at IS NOT NULL
+          AND rbd.id IS NULL
+    """))
+    return pd.DataFrame(result.fetchall(), columns=["user_id", "brand_id", "visited_at"])
+
+def _json_frame(values, columns, user_id):
+    # [[brand_id, ...], ...] 형태의 JSON 배열을 개별 로더와 같은 컬럼의 DataFrame 으로 변환
+    rows = list(zip(*values)) or [[] for _ in columns[1:]]
+    data = {"user_id": np.full(len(values), user_id, dtype="int64")}
+    for column, column_values in zip(columns[1:], rows):
+        data[column] = np.asarray(column_values, dtype="int64" if column == "brand_id" else None)
+    return pd.DataFrame(data, columns=columns)
+
+def load_user_context(conn, user_id, include_interactions=False):
+    # 한 사용자의 프로필/관심·방문 브랜드/즐겨찾기/제외 브랜드(+ include_interactions 이면 인터랙션)를 한 번의 왕복으로 조회
+    # 결과는 개별 로더(load_user_data, load_user_brand_data, ...)와 같은 형태의 DataFrame 으로 반환
+    # 인터랙션은 action_logs 전체 이력을 집계하는 가장 무거운 부분이라, 사용하지 않는 API 재추천 경로에서는 조회하지 않음
+    interactions_cte = ""
+    interactions_column = ""
+    if include_interactions:
+        weight_case = " ".join(f"WHEN '{action}' THEN {weight}" for action, weight in ACTION_WEIGHTS.items())
+        action_types = ", ".join(f"'{action}'" for action in ACTION_WEIGHTS)
+        interactions_cte = f"""
+        interactions AS (
+            SELECT b.id AS brand_id, SUM(CASE al.action_type {weight_case} END) AS weight
+            FROM action_logs al
+            JOIN store s ON al.store_id = s.id
+            JOIN brands b ON s.brand_id = b.id
+            WHERE al.user_id = :user_id
+              AND al.action_type IN ({action_types})
+              AND NOT EXISTS (SELECT 1 FROM excluded e WHERE e.brand_id = b.id)
+            GROUP BY b.id
+        ),"""
+        interactions_column = """
+            (SELECT COALESCE(json_agg(json_build_array(brand_id, weight)), '[]') FROM interactions)::text,"""
+
+    query = f"""
+        WITH excluded AS (
+            SELECT brand_id FROM recommendation_base_data
+            WHERE user_id = :user_id AND data_type = 'EXCLUDE'
+        ),
+        user_brand AS (
+            SELECT combined.brand_id, combined.data_type FROM (
+                SELECT brand_id, 'INTEREST' AS data_type
+                FROM recommendation_base_data WHERE user_id = :user_id AND data_type = 'INTEREST'
+                UNION
+                SELECT DISTINCT brand_id, 'RECENT' AS data_type
+                FROM history WHERE user_id = :user_id AND visited_at IS NOT NULL
+            ) AS combined
+            WHERE NOT EXISTS (SELECT 1 FROM excluded e WHERE e.brand_id = combined.brand_id)
+        ),{interactions_cte}
+        bookmarks AS (
+            SELECT s.brand_id
+            FROM bookmark b
+            JOIN bookmark_list bl ON b.bookmark_list_id = bl.id
+            JOIN store s ON b.store_id = s.id
+            WHERE bl.user_id = :user_id
+              AND NOT EXISTS (SELECT 1 FROM excluded e WHERE e.brand_id = s.brand_id)
+        )
+        SELECT
+            u.id, u.gender, u.age_range,
+            (SELECT COALESCE(json_agg(json_build_array(brand_id, data_type)), '[]') FROM user_brand)::text,{interactions_column}
+            (SELECT COALESCE(json_agg(json_build_array(brand_id)), '[]') FROM bookmarks)::text,
+            (SELECT COALESCE(json_agg(json_build_array(brand_id)), '[]') FROM excluded)::text
+        FROM users u
+        WHERE u.id = :user_id
+    """
+    row = conn.execute(text(query), {"user_id": user_id}).fetchone()
+
+    # json 컬럼은 드라이버마다 디코딩 방식이 달라 text 로 받아 직접 파싱
+    n_lists = 4 if include_interactions else 3
+    lists = [[] for _ in range(n_lists)] if row is None else [json.loads(v) for v in row[3:]]
+    if include_interactions:
+        user_brand, interactions, bookmarks, excluded = lists
+    else:
+        user_brand, bookmarks, excluded = lists
+
+    context = {
+        "user_df": pd.DataFrame([row[:3]] if row is not None else [], columns=["user_id", "gender", "age_range"]),
+        "user_brand_df": _json_frame(user_brand, ["user_id", "brand_id", "data_type"], user_id),
+        "bookmark_df": _json_frame(bookmarks, ["user_id", "brand_id"], user_id),
+        "exclude_brand_df": _json_frame(excluded, ["user_id", "brand_id"], user_id),
+    }
+    if include_interactions:
+        context["interaction_df"] = _json_frame(interactions, ["user_id", "brand_id", "weight"], user_id)
+    return context
@@ -0,0 +1,153 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from app.config.settings import (
+    RECOMMENDATION_CACHE_BACKEND,
+    RECOMMENDATION_CACHE_SIZE,
+    RECOMMENDATION_CACHE_TTL,
+    RECOMMENDATION_CACHE_PROBE_INTERVAL,
+)
+from app.data.loader import load_live_recommendation_run
+
+'''
+GET /recommendations/{user_id} 읽기 캐시
+
+배치가 공개한 추천 결과(응답 JSON)를 사용자별로 캐시하고, 미스일 때만 recommendation 테이블을 조회한다.
+캐시 키에 공개된 배치 run_id(세대)를 넣어, 새 배치가 공개되면 이전 세대 항목은 더 이상 조회되지 않고 LRU/TTL 로 밀려난다.
+run_id 는 RECOMMENDATION_CACHE_PROBE_INTERVAL 마다 한 번만 확인하므로 다른 프로세스(배치 작업, 다른 워커)의 공개도 반영된다.
+/re-recommendation 은 해당 사용자 항목만 무효화한다. (local 백엔드는 워커별 캐시라 다른 워커는 TTL 이후 반영)
+
+저장소는 get/set/delete/clear 를 가진 백엔드로 분리되어 있어, 여러 워커가 함께 쓰는 공유 캐시 구현을
+register_cache_backend 로 등록하고 RECOMMENDATION_CACHE_BACKEND 로 선택할 수 있다. 기본값 local 은 그 자리를 대신하는 프로세스 내 LRU + TTL 이다.
+'''
+
+logger = logging.getLogger(__name__)
+
+# set() 에 세대를 지정하지 않으면 현재 세대 사용
+_CURRENT = object()
+
+class LocalCacheBackend:
+    def __init__(self, max_size=RECOMMENDATION_CACHE_SIZE, ttl=RECOMMENDATION_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+_BACKENDS = {"local": LocalCacheBackend}
+
+def register_cache_backend(name, factory):
+    # factory(max_size=..., ttl=...) -> get/set/delete/clear 를 가진 객체 (값은 bytes)
+    _BACKENDS[name] = factory
+
+def create_cache_backend(name=RECOMMENDATION_CACHE_BACKEND, max_size=RECOMMENDATION_CACHE_SIZE, ttl=RECOMMENDATION_CACHE_TTL):
+    if name not in _BACKENDS:
+        raise ValueError(f"알 수 없는 추천 캐시 백엔드: {name} (사용 가능: {sorted(_BACKENDS)})")
+    return _BACKENDS[name](max_size=max_size, ttl=ttl)
+
+class RecommendationCache:
+    def __init__(self, backend=None, probe_interval=RECOMMENDATION_CACHE_PROBE_INTERVAL):
+        self._backend = backend
+        self.probe_interval = probe_interval
+        self.generation = None
+        self._next_probe_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.probes = 0
+        self.invalidations = 0
+
+    @property
+    def backend(self):
+        # 백엔드는 처음 사용할 때 생성 (설정 오류가 import 시점이 아닌 요청 처리에서 드러나도록)
+        if self._backend is None:
+            self._backend = create_cache_backend()
+        return self._backend
+
+    def _key(self, user_id, generation=_CURRENT):
+        return f"recommendations:{self.generation if generation is _CURRENT else generation}:{user_id}"
+
+    def probe_due(self):
+        return time.monotonic() >= self._next_probe_at
+
+    def refresh_generation(self, conn):
+        # 동기 커넥션에서 실행 (API 는 AsyncConnection.run_sync 로 호출)
+        self.probes += 1
+        try:
+            generation = load_live_recommendation_run(conn)
+        except Exception as e:
+            # 스냅샷 교체 이력 테이블이 아직 없으면 세대 없이 TTL 기준으로만 갱신
+            logger.debug(f"추천 결과 세대 조회 실패: {e}")
+            generation = None
+        if generation != self.generation:
+            logger.info(f"🗂️ 추천 결과 세대 변경: {self.generation} -> {generation}")
+            self.generation = generation
+        self._next_probe_at = time.monotonic() + self.probe_interval
+        return generation
+
+    def get(self, user_id):
+        body = self.backend.get(self._key(user_id))
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body
+
+    def set(self, user_id, body, generation=_CURRENT):
+        # generation: DB 조회를 시작한 시점의 세대 (조회 중 세대가 바뀌어도 이전 결과가 새 세대 키로 저장되지 않도록)
+        self.backend.set(self._key(user_id, generation), body)
+
+    def invalidate(self, user_id):
+        self.invalidations += 1
+        self.backend.delete(self._key(user_id))
+
+    def clear(self):
+        # 배치 공개 직후: 전체 삭제 후 다음 요청에서 세대를 다시 확인
+        self.invalidations += 1
+        self.backend.clear()
+        self._next_probe_at = 0.0
+
+    def stats(self):
+        total = self.hits + self.misses
+        backend = self._backend
+        return {
+            "backend": type(backend).__name__ if backend is not None else None,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "probes": self.probes,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+            "size": len(backend) if backend is not None and hasattr(backend, "__len__") else None,
+        }
+
+recommendation_cache = RecommendationCache()
@@ -1,88 +1,137 @@
-from collections import defaultdict
 import pandas as pd
 import random
 
 '''
 user, brand, interactions feature 구성
-'''
 
-def build_user_features(user_brand_df, bookmark_df, brand_df, exclude_brand_ids=None):
-    exclude_brand_ids = set(exclude_brand_ids or [])
+모든 피처/인터랙션은 (id, feature 또는 brand_id, weight) 형태의 COO triple DataFrame 으로 먼저 만들고,
+LightFM Dataset 에 넘길 때 필요한 형태로 변환한다.
+'''
 
-    user_feature_map = defaultdict(list)
-    bookmark_map = bookmark_df.groupby("user_id")["brand_id"].apply(list).to_dict()
-    brand_to_category = dict(zip(brand_df["brand_id"], brand_df["category_id"]))
+# 사용자 피처 유형별 최대 개수와 가중치 (interest > recent > bookmark)
+USER_FEATURE_CAP = 5
+INTEREST_WEIGHT = 3.0
+RECENT_WEIGHT = 2.0
+BOOKMARK_WEIGHT = 1.0
+CATEGORY_WEIGHT = 2.0
+
+# 로그가 없는 사용자에게 부여하는 더미 인터랙션 가중치
+DUMMY_INTEREST_WEIGHT = 2.0
+DUMMY_RECENT_WEIGHT = 3.0
+DUMMY_RANDOM_WEIGHT = 1.0
+
+def _first_n(df, n, key="user_id"):
+    # 원래 행 순서를 유지한 채 key 별 앞에서부터 n개
+    return df[df.groupby(key, sort=False).cumcount() < n]
+
+def _feature_frame(ids, prefix, values, weight, id_col):
+    return pd.DataFrame({
+        id_col: ids.to_numpy(),
+        "feature": prefix + values.astype(str).to_numpy(dtype=object),
+        "weight": weight
+    })
+
+def _aggregate_triples(frames, id_col):
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame({id_col: [], "feature": [], "weight": []})
+    triples = pd.concat(frames, ignore_index=True)
+    # 같은 피처가 여러 번 나오면 가중치 합 (기존 리스트 반복 방식과 동일)
+    return triples.groupby([id_col, "feature"], sort=False)["weight"].sum().reset_index()
+
+def triples_to_feature_map(triples, id_col, ids):
+    # LightFM Dataset 이 받는 {id: {feature: weight}} 형태로 변환 (피처가 없는 id 도 빈 dict 로 포함)
+    feature_map = {entity_id: {} for entity_id in ids}
+    for entity_id, feature, weight in zip(triples[id_col].to_numpy(), triples["feature"].to_numpy(), triples["weight"].to_numpy()):
+        feature_map[entity_id][feature] = weight
+    return feature_map
+
+def brand_category_lookup(brand_df):
+    # brand_id -> category_id (브랜드가 중복되면 마지막 행 기준)
+    return brand_df.drop_duplicates("brand_id", keep="last").set_index("brand_id")["category_id"]
+
+def build_user_feature_triples(user_brand_df, bookmark_df, brand_df, exclude_brand_ids=None, brand_to_category=None):
+    exclude_brand_ids = list(set(exclude_brand_ids or []))
+    user_ids = pd.unique(user_brand_df["user_id"])
 
     # 최종적으로 부여되는 가중치 비중은 (최대로 데이터를 가져왔을 때) 최대 개수 * 가중치
     # 관심 브랜드 > 방문 브랜드 > 즐겨찾기 블랜드
     # 사용자마다 데이터 수의 편차가 있을 것이고, 아직은 초창기라 데이터가 많지 않을 것을 고려하여 다음과 같이 개수 지정
     # 실사용자 받아서 몇개의 관심 브랜드 데이터 / 방문 브랜드 데이터 / 북마크 데이터가 몇개정도 저장하는지 확인해서 지정 예정
-    for user_id, group in user_brand_df.groupby("user_id"):
-        interest = group[(group["data_type"] == "INTEREST") & (~group["brand_id"].isin(exclude_brand_ids))]["brand_id"].tolist()[:5]
-        recent = group[(group["data_type"] == "RECENT") & (~group["brand_id"].isin(exclude_brand_ids))]["brand_id"].tolist()[:5]
-        bookmarked = [b for b in bookmark_map.get(user_id, []) if b not in exclude_brand_ids][:5]
-
-        features = (
-            [f"interest_{b}" for b in interest] * 3 +
-            [f"recent_{b}" for b in recent] * 2 +
-            [f"bookmark_{b}" for b in bookmarked] * 1
-        )
-
-        category_ids = {brand_to_category.get(b) for b in recent + interest + bookmarked if brand_to_category.get(b)}
-        features += [f"cat_{cid}" for cid in category_ids] * 2
-
-        user_feature_map[user_id] = features
-
-    return user_feature_map
-
-def build_item_features(brand_df):
-    item_feature_map = {}
-
-    for _, row in brand_df.iterrows():
-        brand_id = row["brand_id"]
-        features = []
-
-        # 카테고리
-        category_id = row.get("category_id")
-        if not pd.isna(category_id) and pd.api.types.is_numeric_dtype(type(category_id)):
-            try:
-                features.append(f"category_{int(category_id)}")
-            except (ValueError, TypeError):
-                pass
-
-        # 온라인/오프라인
-        store_type = row.get("store_type")
-        if not pd.isna(store_type) and isinstance(store_type, str):
-            features.append(f"store_{store_type.lower()}")
-
-        # 예시: 브랜드명 키워드 (간단 토크나이징)
-        brand_name = row.get("brand_name")
-        if not pd.isna(brand_name) and isinstance(brand_name, str):
-            tokens = brand_name.lower().split()
-            features += [f"name_{token}" for token in tokens]
-
-        item_feature_map[brand_id] = features
-
-    return item_feature_map
-
-def build_interactions(dataset, interaction_df, user_brand_df, brand_df):
-    users_with_logs = set(interaction_df["user_id"])
-    all_users = set(user_brand_df["user_id"].unique())
-    users_without_logs = all_users - users_with_logs
-
-    dummy_interactions = []
-    for user_id in users_without_logs:
-        group = user_brand_df[user_brand_df["user_id"] == user_id]
-        recent = group[group["data_type"] == "RECENT"]["brand_id"].tolist()
-        interest = group[group["data_type"] == "INTEREST"]["brand_id"].tolist()
-
-        dummy_interactions += [(user_id, b, 2.0) for b in interest]
-        dummy_interactions += [(user_id, b, 3.0) for b in recent]
-
-        if not interest and not recent:
+    user_brand = user_brand_df[~user_brand_df["brand_id"].isin(exclude_brand_ids)]
+    interest = _first_n(user_brand[user_brand["data_type"] == "INTEREST"], USER_FEATURE_CAP)
+    recent = _first_n(user_brand[user_brand["data_type"] == "RECENT"], USER_FEATURE_CAP)
+    bookmarked = _first_n(
+        bookmark_df[bookmark_df["user_id"].isin(user_ids) & ~bookmark_df["brand_id"].isin(exclude_brand_ids)],
+        USER_FEATURE_CAP
+    )
+
+    frames = [
+        _feature_frame(interest["user_id"], "interest_", interest["brand_id"], INTEREST_WEIGHT, "user_id"),
+        _feature_frame(recent["user_id"], "recent_", recent["brand_id"], RECENT_WEIGHT, "user_id"),
+        _feature_frame(bookmarked["user_id"], "bookmark_", bookmarked["brand_id"], BOOKMARK_WEIGHT, "user_id"),
+    ]
+
+    # 관심/방문/즐겨찾기 브랜드의 카테고리 확장 (사용자별 카테고리 중복 제거)
+    if brand_to_category is None:
+        brand_to_category = brand_category_lookup(brand_df)
+    selected = pd.concat([recent[["user_id", "brand_id"]], interest[["user_id", "brand_id"]], bookmarked[["user_id", "brand_id"]]])
+    categories = pd.DataFrame({"user_id": selected["user_id"].to_numpy(), "category_id": selected["brand_id"].map(brand_to_category).to_numpy()})
+    categories = categories[categories["category_id"].notna() & (categories["category_id"] != 0)].drop_duplicates()
+    categories["category_id"] = categories["category_id"].astype(brand_to_category.dtype)
+    frames.append(_feature_frame(categories["user_id"], "cat_", categories["category_id"], CATEGORY_WEIGHT, "user_id"))
+
+    return _aggregate_triples(frames, "user_id")
+
+def build_user_features(user_brand_df, bookmark_df, brand_df, exclude_brand_ids=None, brand_to_category=None):
+    triples = build_user_feature_triples(user_brand_df, bookmark_df, brand_df, exclude_brand_ids, brand_to_category)
+    return triples_to_feature_map(triples, "user_id", pd.unique(user_brand_df["user_id"]))
+
+def build_item_feature_triples(brand_df):
+    frames = []
+
+    # 카테고리
+    if "category_id" in brand_df and pd.api.types.is_numeric_dtype(brand_df["category_id"]):
+        category = brand_df[brand_df["category_id"].notna()]
+        frames.append(_feature_frame(category["brand_id"], "category_", category["category_id"].astype("int64"), 1.0, "brand_id"))
+
+    # 온라인/오프라인
+    if "store_type" in brand_df and brand_df["store_type"].dtype == object:
+        store_type = brand_df["store_type"].str.lower()
+        store = brand_df.assign(store_type=store_type)[store_type.notna()]
+        frames.append(_feature_frame(store["brand_id"], "store_", store["store_type"], 1.0, "brand_id"))
+
+    # 예시: 브랜드명 키워드 (간단 토크나이징)
+    if "brand_name" in brand_df and brand_df["brand_name"].dtype == object:
+        tokens = brand_df[["brand_id"]].assign(token=brand_df["brand_name"].str.lower().str.split()).explode("token")
+        tokens = tokens[tokens["token"].notna()]
+        frames.append(_feature_frame(tokens["brand_id"], "name_", tokens["token"], 1.0, "brand_id"))
+
+    return _aggregate_triples(frames, "brand_id")
+
+def build_interaction_triples(interaction_df, user_brand_df, brand_df):
+    # 행동 로그가 없는 사용자는 관심/방문 브랜드로 더미 인터랙션 구성
+    without_logs = user_brand_df[~user_brand_df["user_id"].isin(interaction_df["user_id"])]
+    interest = without_logs[without_logs["data_type"] == "INTEREST"]
+    recent = without_logs[without_logs["data_type"] == "RECENT"]
+
+    frames = [
+        interaction_df[["user_id", "brand_id", "weight"]],
+        interest[["user_id", "brand_id"]].assign(weight=DUMMY_INTEREST_WEIGHT),
+        recent[["user_id", "brand_id"]].assign(weight=DUMMY_RECENT_WEIGHT),
+    ]
+
+    # 관심/방문 브랜드가 모두 없는 사용자는 user_id 시드로 랜덤 브랜드 하나
+    no_brand_users = set(without_logs["user_id"]) - set(interest["user_id"]) - set(recent["user_id"])
+    if no_brand_users:
+        brand_ids = brand_df["brand_id"].tolist()
+        random_rows = []
+        for user_id in no_brand_users:
             random.seed(user_id)
-            random_brand = random.choice(brand_df["brand_id"].tolist())
-            dummy_interactions.append((user_id, random_brand, 1.0))
+            random_rows.append((user_id, random.choice(brand_ids), DUMMY_RANDOM_WEIGHT))
+        frames.append(pd.DataFrame(random_rows, columns=["user_id", "brand_id", "weight"]))
 
-    real = list(zip(interaction_df["user_id"], interaction_df["brand_id"], interaction_df["weight"]))
-    return dataset.build_interactions(real + dummy_interactions)
\ No newline at end of file
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame({"user_id": [], "brand_id": [], "weight": []})
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+'''
+builder 의 COO triple 로부터 LightFM 입력 행렬(CSR 피처 행렬, COO 인터랙션/가중치 행렬)을 직접 구성
+
+Dataset.build_* 에 (id, [feature ...]) 튜플 리스트를 넘기면 행마다 파이썬 객체가 생기므로,
+id/피처 이름을 Dataset 매핑 기준 정수 코드로 한 번에 변환한 뒤 배열로 행렬을 만든다.
+Dataset 은 id/피처 매핑을 관리하는 용도로만 사용하며, 결과 행렬은 Dataset.build_* 결과와 동일하다.
+'''
+
+def _mapping_index(mapping):
+    keys = [None] * len(mapping)
+    for key, idx in mapping.items():
+        keys[idx] = key
+    return pd.Index(keys)
+
+def _codes(mapping_index, values, kind):
+    codes = mapping_index.get_indexer(values)
+    if (codes < 0).any():
+        missing = pd.unique(np.asarray(values)[codes < 0])[:5]
+        raise ValueError(f"{kind} {list(missing)} not in mapping. Make sure you call fit_dataset first.")
+    return codes
+
+def fit_dataset(user_ids, brand_ids, user_feature_triples, item_feature_triples, dataset=None):
+    # 피처 이름은 factorize 로 중복 제거한 어휘만 매핑에 등록
+    user_vocab = pd.factorize(user_feature_triples["feature"])[1]
+    item_vocab = pd.factorize(item_feature_triples["feature"])[1]
+
+    if dataset is None:
+        # lightfm.data 는 sklearn 까지 불러오므로 학습(배치)에서만 import, API 는 행렬 구성 함수만 사용
+        from lightfm.data import Dataset
+        dataset = Dataset()
+    dataset.fit_partial(users=pd.unique(np.asarray(user_ids)), items=pd.unique(np.asarray(brand_ids)),
+                        user_features=user_vocab, item_features=item_vocab)
+    return dataset
+
+def _build_feature_matrix(id_mapping, feature_mapping, triples, id_col, normalize=True, row_ids=None):
+    # row_ids 가 있으면 매핑 전체가 아니라 해당 id 들의 행만 그 순서대로 구성 (매핑에 있는 id 여야 함)
+    id_index = _mapping_index(id_mapping) if row_ids is None else pd.Index(row_ids)
+    feature_index = _mapping_index(feature_mapping)
+    n_rows, n_cols = len(id_index), len(feature_mapping)
+
+    rows = _codes(id_index, triples[id_col].to_numpy(), id_col)
+    cols = _codes(feature_index, triples["feature"].to_numpy(), "feature")
+    data = triples["weight"].to_numpy(dtype=np.float32)
+
+    # Dataset(identity_features=True) 이면 id 자체가 피처 매핑에 등록되어 있음
+    identity_cols = feature_index.get_indexer(id_index)
+    if n_rows > 0 and (identity_cols >= 0).all():
+        rows = np.concatenate([np.arange(n_rows), rows])
+        cols = np.concatenate([identity_cols, cols])
+        data = np.concatenate([np.ones(n_rows, dtype=np.float32), data])
+
+    # 중복 (행, 피처) 는 tocsr 에서 합산
+    matrix = sp.coo_matrix((data, (rows, cols)), shape=(n_rows, n_cols), dtype=np.float32).tocsr()
+
+    if normalize:
+        # LightFM 과 동일하게 행 가중치 합이 1 이 되도록 l1 정규화
+        if np.any(np.diff(matrix.indptr) == 0):
+            raise ValueError(
+                "Cannot normalize feature matrix: some rows have zero norm. "
+                "Ensure that features were provided for all entries."
+            )
+        row_sums = np.asarray(abs(matrix).sum(axis=1), dtype=np.float32).ravel()
+        matrix.data /= np.repeat(row_sums, np.diff(matrix.indptr))
+
+    return matrix
+
+def build_user_feature_matrix(dataset, user_feature_triples, normalize=True):
+    user_id_map, user_feature_map, _, _ = dataset.mapping()
+    return _build_feature_matrix(user_id_map, user_feature_map, user_feature_triples, "user_id", normalize=normalize)
+
+def build_user_feature_rows(dataset, user_ids, user_feature_triples, normalize=True):
+    # 사용자 일부(shard)의 피처 행렬, 행 순서는 user_ids 순서 (build_user_feature_matrix 의 해당 행과 동일)
+    # 학습 이후 생긴 피처(새 브랜드/카테고리)는 임베딩이 없으므로 build_feature_row 와 같이 무시
+    _, user_feature_map, _, _ = dataset.mapping()
+    known = user_feature_triples["feature"].isin(list(user_feature_map))
+    return _build_feature_matrix(None, user_feature_map, user_feature_triples[known], "user_id", normalize=normalize,
+                                 row_ids=user_ids)
+
+def build_item_feature_matrix(dataset, item_feature_triples, normalize=True):
+    _, _, item_id_map, item_feature_map = dataset.mapping()
+    return _build_feature_matrix(item_id_map, item_feature_map, item_feature_triples, "brand_id", normalize=normalize)
+
+def build_interaction_matrices(dataset, interaction_triples):
+    user_id_map, _, item_id_map, _ = dataset.mapping()
+    shape = (len(user_id_map), len(item_id_map))
+
+    rows = _codes(_mapping_index(user_id_map), interaction_triples["user_id"].to_numpy(), "user_id")
+    cols = _codes(_mapping_index(item_id_map), interaction_triples["brand_id"].to_numpy(), "brand_id")
+
+    # Dataset.build_interactions 와 동일: 중복 항목을 합치지 않은 COO (interactions=1, weights=가중치)
+    interactions = sp.coo_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=shape)
+    weights = sp.coo_matrix((interaction_triples["weight"].to_numpy(dtype=np.float32), (rows, cols)), shape=shape)
+    return interactions, weights
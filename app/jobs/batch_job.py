@@ -0,0 +1,168 @@
+import os
+import re
+import json
+import uuid
+import fcntl
+import logging
+import threading
+import traceback
+import multiprocessing
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import text
+from app.config.settings import BATCH_JOB_DIR, BATCH_JOB_KEEP, BATCH_ADVISORY_LOCK_KEY
+
+'''
+배치 추천을 별도 프로세스의 백그라운드 작업으로 실행
+
+- 작업마다 job_id 를 발급하고, 진행 상황(현재 단계, 단계별 소요 시간, 결과/오류)을 <BATCH_JOB_DIR>/<job_id>.json 에 기록한다.
+  상태 파일로 공유하므로 어느 API 워커에서도 조회할 수 있다.
+- <BATCH_JOB_DIR>/batch.lock 파일 잠금(flock)으로 같은 호스트에서 한 번에 하나의 배치만 실행한다.
+  잠금은 작업을 시작한 워커가 자식 프로세스가 끝날 때까지 쥐고 있고, 워커가 죽으면 OS 가 해제한다.
+- 여러 레플리카(호스트)에서는 배치 프로세스(main)가 실행 내내 Postgres advisory lock(batch_advisory_lock)을 쥐고 있어,
+  다른 호스트에서 시작된 배치는 BatchAlreadyRunning 으로 실패한다. 프로세스가 죽으면 DB 세션과 함께 해제된다.
+- 학습은 CPU/메모리를 오래 점유하므로 API 프로세스와 분리된 spawn 프로세스에서 실행한다.
+'''
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILE = "batch.lock"
+
+STATUS_QUEUED = "QUEUED"
+STATUS_RUNNING = "RUNNING"
+STATUS_SUCCEEDED = "SUCCEEDED"
+STATUS_FAILED = "FAILED"
+FINISHED_STATUSES = {STATUS_SUCCEEDED, STATUS_FAILED}
+
+class BatchAlreadyRunning(Exception):
+    def __init__(self, job_id=None):
+        super().__init__(f"이미 실행 중인 배치가 있습니다: {job_id or '다른 호스트/프로세스'}")
+        self.job_id = job_id
+
+@contextmanager
+def batch_advisory_lock(engine, key=BATCH_ADVISORY_LOCK_KEY):
+    # 세션 단위 잠금이라 배치가 끝날 때까지 커넥션 하나를 쥐고 있음
+    # AUTOCOMMIT: 몇 시간짜리 배치 동안 idle in transaction 으로 남아 세션이 끊기지(잠금이 풀리지) 않도록
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar():
+            raise BatchAlreadyRunning()
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+def _status_path(job_id, job_dir):
+    # job_id 는 경로에 그대로 들어가므로 발급 형식만 허용
+    if not re.fullmatch(r"\d{14}-[0-9a-f]{8}", job_id):
+        raise ValueError(f"잘못된 job_id: {job_id}")
+    return os.path.join(job_dir, f"{job_id}.json")
+
+def _write_status(status, job_dir):
+    path = _status_path(status["job_id"], job_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(status, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+def read_job_status(job_id, job_dir=None):
+    try:
+        with open(_status_path(job_id, job_dir or BATCH_JOB_DIR)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _cleanup_statuses(job_dir, keep):
+    statuses = sorted(f for f in os.listdir(job_dir) if f.endswith(".json"))
+    for name in statuses[:-keep] if keep > 0 else statuses:
+        os.remove(os.path.join(job_dir, name))
+
+def _run_job(job_id, job_dir):
+    # 자식 프로세스 진입점: 무거운 배치 모듈은 여기서만 import
+    logging.basicConfig(level=logging.INFO)
+    from app.main import main, batch_stages
+    from app.utils.pipeline import PipelineRun
+
+    status = read_job_status(job_id, job_dir)
+    status.update({"status": STATUS_RUNNING, "pid": os.getpid(), "started_at": _now(),
+                   "total_stages": len(batch_stages()), "completed_stages": 0})
+    _write_status(status, job_dir)
+
+    def on_stage(event, record, run):
+        status["stage"] = record["name"]
+        status["stages"] = run.stages
+        status["completed_stages"] = sum(1 for stage in run.stages if stage["status"] == "DONE")
+        _write_status(status, job_dir)
+
+    try:
+        result = main(PipelineRun([on_stage]))
+    except BaseException as e:
+        status.update({"status": STATUS_FAILED, "finished_at": _now(), "error": str(e),
+                       "traceback": traceback.format_exc()})
+        _write_status(status, job_dir)
+        raise SystemExit(1)
+
+    status.update({"status": STATUS_SUCCEEDED, "stage": None, "finished_at": _now(), "result": result})
+    _write_status(status, job_dir)
+
+class BatchJobRunner:
+    def __init__(self, job_dir=None, keep=BATCH_JOB_KEEP):
+        self.job_dir = job_dir or BATCH_JOB_DIR
+        self.keep = keep
+
+    def _acquire_lock(self):
+        os.makedirs(self.job_dir, exist_ok=True)
+        fd = os.open(os.path.join(self.job_dir, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            running_job_id = os.read(fd, 64).decode().strip() or None
+            os.close(fd)
+            raise BatchAlreadyRunning(running_job_id)
+        return fd
+
+    def start(self, on_success=None):
+        fd = self._acquire_lock()
+        try:
+            job_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, job_id.encode(), 0)
+
+            _cleanup_statuses(self.job_dir, self.keep - 1)
+            _write_status({"job_id": job_id, "status": STATUS_QUEUED, "created_at": _now(), "stages": []}, self.job_dir)
+
+            process = multiprocessing.get_context("spawn").Process(
+                target=_run_job, args=(job_id, self.job_dir), name=f"batch-{job_id}"
+            )
+            process.start()
+        except BaseException:
+            os.close(fd)
+            raise
+
+        threading.Thread(target=self._watch, args=(process, fd, job_id, on_success),
+                         name=f"batch-watch-{job_id}", daemon=True).start()
+        logger.info(f"🚀 배치 작업 시작 (job_id={job_id}, pid={process.pid})")
+        return job_id
+
+    def _watch(self, process, fd, job_id, on_success):
+        # 자식 프로세스 종료를 기다려 잠금을 풀고, 비정상 종료(OOM kill 등)로 상태가 남지 않은 경우 실패로 기록
+        try:
+            process.join()
+            status = read_job_status(job_id, self.job_dir) or {"job_id": job_id}
+            if status.get("status") not in FINISHED_STATUSES:
+                status.update({"status": STATUS_FAILED, "finished_at": _now(),
+                               "error": f"배치 프로세스가 비정상 종료되었습니다 (exitcode={process.exitcode})"})
+                _write_status(status, self.job_dir)
+
+            logger.info(f"🏁 배치 작업 종료 (job_id={job_id}, status={status['status']})")
+            if status["status"] == STATUS_SUCCEEDED and on_success is not None:
+                on_success(status)
+        except Exception:
+            logger.error(f"배치 작업 마무리 중 오류 발생 (job_id={job_id})", exc_info=True)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+batch_job_runner = BatchJobRunner()
@@ -1,100 +1,240 @@
+import logging
 from datetime import datetime
-from app.saver.db_saver import save_statistics
+from app.saver.db_saver import replace_recommendation_statistics
 from app.config.database import get_engine
 from app.data.loader import *
-from app.features.builder import build_user_features, build_item_features, build_interactions
-from app.model.trainer import prepare_dataset, train_model
-from app.model.recommender import generate_recommendations
-from app.saver.db_saver import save_to_db
+from app.features.builder import build_user_feature_triples, build_item_feature_triples, build_interaction_triples
+from app.features.matrix import fit_dataset, build_user_feature_matrix, build_item_feature_matrix, build_interaction_matrices
+from app.model.trainer import train_model, train_model_incremental, train_model_early_stopping
+from app.model.recommender import generate_recommendations, IdIndex
+from app.model.store import save_model_artifact, load_model_artifact
+from app.config.settings import TRAIN_MODE, EARLY_STOPPING, BATCH_REPORT_DIR, BATCH_STREAMING, SCORING_PROCESSES
+from app.saver.snapshot import save_recommendation_snapshot
+from app.model.streaming import stream_recommendations
 from app.utils.statistics import prepare_statistics_df
 from app.saver.file_exporter import save_to_csv
 from app.utils.evaluator import evaluate_recommendations
-
-def main():
+from app.utils.pipeline import PipelineRun
+from app.jobs.batch_job import batch_advisory_lock
+
+# main() 이 기록하는 단계 (진행률 표시용)
+BATCH_STAGES = [
+    "load_users", "load_brands", "load_user_brands", "load_interactions", "load_bookmarks", "load_excludes",
+    "build_user_features", "build_item_features", "fit_dataset", "build_interaction_matrix", "build_user_feature_matrix",
+    "train", "save_model", "score", "evaluate", "save_recommendations", "save_statistics",
+]
+STREAMING_BATCH_STAGES = BATCH_STAGES[:BATCH_STAGES.index("save_model") + 1] + ["stream_recommendations"]
+
+def batch_stages():
+    return STREAMING_BATCH_STAGES if BATCH_STREAMING else BATCH_STAGES
+
+def _load_previous_artifact():
+    # 증분 학습은 이전 모델과 데이터 기준 시각이 있어야 가능, 없으면 전체 학습
+    if TRAIN_MODE != "incremental":
+        return None
+    try:
+        artifact = load_model_artifact()
+    except FileNotFoundError:
+        print("⚠️ 이전 모델 아티팩트가 없어 전체 학습으로 진행합니다.")
+        return None
+    if artifact.trained_until is None:
+        print("⚠️ 이전 모델에 학습 기준 시각이 없어 전체 학습으로 진행합니다.")
+        return None
+    return artifact
+
+def main(run=None):
+    # run: 단계별 진행 상황을 받을 PipelineRun (백그라운드 배치 작업에서 전달)
+    run = run or PipelineRun()
+    # 다른 호스트에서 실행 중인 배치가 있으면 리포트를 남기지 않고 바로 실패 (실행 중인 배치의 최근 리포트 유지)
+    with batch_advisory_lock(get_engine()):
+        try:
+            result = _run_pipeline(run)
+        except BaseException as e:
+            run.write_report(BATCH_REPORT_DIR, "FAILED", error=str(e))
+            raise
+    report_path = run.write_report(BATCH_REPORT_DIR, "SUCCEEDED", result=result)
+    print(f"🧾 실행 리포트: {report_path}")
+    return result
+
+def _run_pipeline(run):
     print("🚀 추천 시스템 실행 중...")
 
+    # 이번 배치가 반영하는 데이터의 기준 시각 (다음 증분 학습의 시작점)
+    data_cutoff = datetime.now()
+    previous_artifact = _load_previous_artifact()
+    if previous_artifact is not None:
+        print(f"♻️ 증분 학습 모드 (이전 모델 {previous_artifact.version}, {previous_artifact.trained_until} 이후 데이터)")
+
     print("🔌 DB 연결 중...")
     engine = get_engine()
     with engine.connect() as conn:
-        print("📥 사용자 데이터 로딩 중...")
-        user_df = load_user_data(conn)
-        print(f"👤 사용자 수: {len(user_df)}")
-
-        print("📥 브랜드 데이터 로딩 중...")
-        brand_df = load_brand_data(conn)
-        print(f"🏷️ 브랜드 수: {len(brand_df)}")
-
-        print("📥 온보딩/관심 데이터 로딩 중...")
-        user_brand_df = load_user_brand_data(conn)
-        print(f"📌 관심 브랜드 수: {len(user_brand_df)}")
-
-        print("📥 인터랙션 데이터 로딩 중...")
-        interaction_df = load_interaction_data(conn)
-        print(f"🧩 인터랙션 수: {len(interaction_df)}")
-
-        print("📥 즐겨찾기 데이터 로딩 중...")
-        bookmark_df = load_bookmark_data(conn)
-        print(f"⭐ 즐겨찾기 수: {len(bookmark_df)}")
-
-        print("📥 EXCLUDE 브랜드 로딩 중...")
-        exclude_brand_df = load_exclude_brands(conn)
-        exclude_brand_ids = set(exclude_brand_df["brand_id"].tolist())
-        print(f"🚫 제외 브랜드 수: {len(exclude_brand_ids)}")
+        with run.stage("load_users") as stage:
+            print("📥 사용자 데이터 로딩 중...")
+            user_df = load_user_data(conn)
+            stage["rows"] = len(user_df)
+            print(f"👤 사용자 수: {len(user_df)}")
+
+        with run.stage("load_brands") as stage:
+            print("📥 브랜드 데이터 로딩 중...")
+            brand_df = load_brand_data(conn)
+            stage["rows"] = len(brand_df)
+            print(f"🏷️ 브랜드 수: {len(brand_df)}")
+
+        with run.stage("load_user_brands") as stage:
+            print("📥 온보딩/관심 데이터 로딩 중...")
+            user_brand_df = load_user_brand_data(conn)
+            stage["rows"] = len(user_brand_df)
+            print(f"📌 관심 브랜드 수: {len(user_brand_df)}")
+
+        with run.stage("load_interactions") as stage:
+            print("📥 인터랙션 데이터 로딩 중...")
+            since = previous_artifact.trained_until if previous_artifact is not None else None
+            interaction_df = load_interaction_data(conn, since=since)
+            stage["rows"] = len(interaction_df)
+            print(f"🧩 인터랙션 수: {len(interaction_df)}")
+
+        with run.stage("load_bookmarks") as stage:
+            print("📥 즐겨찾기 데이터 로딩 중...")
+            bookmark_df = load_bookmark_data(conn)
+            stage["rows"] = len(bookmark_df)
+            print(f"⭐ 즐겨찾기 수: {len(bookmark_df)}")
+
+        with run.stage("load_excludes") as stage:
+            print("📥 EXCLUDE 브랜드 로딩 중...")
+            exclude_brand_df = load_exclude_brands(conn)
+            stage["rows"] = len(exclude_brand_df)
+            exclude_brand_ids = set(exclude_brand_df["brand_id"].tolist())
+            print(f"🚫 제외 브랜드 수: {len(exclude_brand_ids)}")
 
     # 피처 생성
-    print("🛠️ 사용자 피처 생성 중...")
-    user_feature_map = build_user_features(user_brand_df, bookmark_df, brand_df, exclude_brand_ids=exclude_brand_ids)
-
-    print("📦 데이터셋 구성 중...")
-
-    print("🛠️ 아이템 피처 생성 중...")
-    item_feature_map = build_item_features(brand_df)
-    dataset = prepare_dataset(user_df, brand_df, user_feature_map, item_feature_map)
-    item_features = dataset.build_item_features([(iid, feats) for iid, feats in item_feature_map.items()])
-
-    print("🔧 인터랙션 + 가중치 매트릭스 구성 중...")
-    interactions, weights = build_interactions(dataset, interaction_df, user_brand_df, brand_df)
-
-    print("🎛️ 사용자 피처 매트릭스 구성 중...")
-    user_features = dataset.build_user_features([(uid, feats) for uid, feats in user_feature_map.items()])
+    with run.stage("build_user_features") as stage:
+        print("🛠️ 사용자 피처 생성 중...")
+        user_feature_triples = build_user_feature_triples(user_brand_df, bookmark_df, brand_df, exclude_brand_ids=exclude_brand_ids)
+        stage["rows"] = len(user_feature_triples)
+
+    with run.stage("build_item_features") as stage:
+        print("🛠️ 아이템 피처 생성 중...")
+        item_feature_triples = build_item_feature_triples(brand_df)
+        stage["rows"] = len(item_feature_triples)
+
+    with run.stage("fit_dataset") as stage:
+        print("📦 데이터셋 구성 중...")
+        if previous_artifact is not None:
+            # 이전 매핑을 유지한 채 신규 사용자/브랜드/피처만 추가
+            new_user_ids = user_df.loc[previous_artifact.id_index.user_rows(user_df["user_id"]) < 0, "user_id"]
+            dataset = fit_dataset(user_df["user_id"], brand_df["brand_id"], user_feature_triples, item_feature_triples,
+                                  dataset=previous_artifact.dataset)
+            print(f"🆕 신규 사용자 수: {len(new_user_ids)}")
+        else:
+            dataset = fit_dataset(user_df["user_id"], brand_df["brand_id"], user_feature_triples, item_feature_triples)
+        id_index = IdIndex(dataset)
+        item_features = build_item_feature_matrix(dataset, item_feature_triples)
+        stage["rows"] = {"users": len(id_index.user_ids), "brands": len(id_index.brand_ids), "item_features_nnz": item_features.nnz}
+
+    with run.stage("build_interaction_matrix") as stage:
+        print("🔧 인터랙션 + 가중치 매트릭스 구성 중...")
+        if previous_artifact is not None:
+            # 증분: 지난 배치 이후 로그 + 신규 사용자의 더미 인터랙션만 학습
+            training_user_brand_df = user_brand_df[user_brand_df["user_id"].isin(new_user_ids)]
+        else:
+            training_user_brand_df = user_brand_df
+        interactions, weights = build_interaction_matrices(
+            dataset, build_interaction_triples(interaction_df, training_user_brand_df, brand_df)
+        )
+        stage["rows"] = interactions.nnz
+
+    with run.stage("build_user_feature_matrix") as stage:
+        print("🎛️ 사용자 피처 매트릭스 구성 중...")
+        user_features = build_user_feature_matrix(dataset, user_feature_triples)
+        stage["rows"] = user_features.nnz
 
     # 모델 학습
-    print("🧠 LightFM 모델 학습 중...")
-    # model = train_model(interactions, weights, user_features)
-    model = train_model(interactions, weights, user_features, item_features)
+    with run.stage("train") as stage:
+        print("🧠 LightFM 모델 학습 중...")
+        # model = train_model(interactions, weights, user_features)
+        training_curve = None
+        if previous_artifact is not None:
+            model = train_model_incremental(previous_artifact.model, interactions, weights, user_features, item_features)
+        elif EARLY_STOPPING:
+            model, training_curve = train_model_early_stopping(interactions, weights, user_features, item_features)
+        else:
+            model = train_model(interactions, weights, user_features, item_features)
+        stage["rows"] = interactions.nnz
+        if training_curve:
+            stage["epochs"] = training_curve[-1].get("epoch")
+
+    # API 서버가 재학습 없이 사용할 수 있도록 모델 아티팩트 배포
+    with run.stage("save_model"):
+        print("📦 모델 아티팩트 저장 중...")
+        model_version = save_model_artifact(model, dataset, item_features, trained_until=data_cutoff,
+                                            training_curve=training_curve)
+        print(f"🏷️ 모델 버전: {model_version}")
+
+    if BATCH_STREAMING:
+        # 학습에만 쓰인 데이터는 해제하고, 사용자 shard 단위로 추천 생성 -> 저장
+        del user_df, user_brand_df, training_user_brand_df, bookmark_df, interaction_df
+        del interactions, weights, user_features, user_feature_triples
+        with run.stage("stream_recommendations") as stage:
+            print("🌊 사용자 shard 단위 추천 생성/저장 중...")
+            streamed = stream_recommendations(engine, model, dataset, item_features, brand_df,
+                                              exclude_brand_ids=exclude_brand_ids, id_index=id_index)
+            stage["rows"] = streamed["recommendations"]
+            stage["shards"] = streamed["shards"]
+            print(f"🔁 추천 결과 교체 완료 (run_id: {streamed['run_id']}, shard {streamed['shards']}개, {streamed['recommendations']}건)")
+
+        print("✅ 추천 완료!")
+        return {"model_version": model_version, "run_id": streamed["run_id"], "recommendations": streamed["recommendations"]}
 
     # 추천 생성
-    print("📊 추천 결과 생성 중...")
-    recommend_df = generate_recommendations(
-        user_df, brand_df, model, dataset,
-        user_features, item_features,
-        exclude_brand_ids=exclude_brand_ids
-    )
-    print(f"🎯 추천 결과 개수: {len(recommend_df)}")
+    with run.stage("score") as stage:
+        print("📊 추천 결과 생성 중...")
+        recommend_df = generate_recommendations(
+            user_df, brand_df, model, dataset,
+            user_features, item_features,
+            exclude_brand_ids=exclude_brand_ids,
+            id_index=id_index,
+            workers=SCORING_PROCESSES
+        )
+        print(f"🎯 추천 결과 개수: {len(recommend_df)}")
+        stage["rows"] = len(recommend_df)
 
     # 5. 추천 평가
-    # evaluate_recommendations(recommend_df, user_brand_df, bookmark_df, interaction_df, brand_df)
-    evaluate_recommendations(recommend_df, user_brand_df, brand_df)
+    with run.stage("evaluate") as stage:
+        print("🧪 추천 결과 평가 중...")
+        evaluation = evaluate_recommendations(recommend_df, user_brand_df, brand_df)
+        stage["rows"] = len(recommend_df)
+        # 지표/예시 사용자는 실행 리포트(BATCH_REPORT_DIR)에 함께 기록
+        stage["metrics"] = evaluation
+        if evaluation["users"]:
+            print(f"📊 평가 지표 (k={evaluation['k']}, 사용자 {evaluation['users']}명): "
+                  + ", ".join(f"{name}={evaluation[name]:.4f}" for name in ["precision", "recall", "hit", "category_match_rate"]))
 
     # DB 저장
-    print("💾 추천 결과 DB 저장 중...")
-    save_to_db(engine, recommend_df)
+    with run.stage("save_recommendations") as stage:
+        print("💾 추천 결과 DB 저장 중...")
+        run_id = save_recommendation_snapshot(engine, recommend_df)
+        stage["rows"] = len(recommend_df)
+        print(f"🔁 추천 결과 교체 완료 (run_id: {run_id})")
 
     # CSV 저장
     # print("📄 추천 결과 CSV 저장 중...")
     # save_to_csv(recommend_df)
 
-    # 📊 통계용 데이터 구성
-    statistics_df = prepare_statistics_df(recommend_df, brand_df)
+    with run.stage("save_statistics") as stage:
+        # 📊 통계용 데이터 구성
+        statistics_df = prepare_statistics_df(recommend_df, brand_df)
+        stage["rows"] = len(statistics_df)
 
-    # DB에 통계 저장
-    try:
-        print("📥 통계 데이터 저장 중...")
-        save_statistics(engine, statistics_df)
-    except Exception as e:
-        print(f"❌ 통계 저장 중 오류 발생: {e}")
+        # DB에 통계 저장
+        try:
+            print("📥 통계 데이터 저장 중...")
+            replace_recommendation_statistics(engine, statistics_df)
+        except Exception as e:
+            print(f"❌ 통계 저장 중 오류 발생: {e}")
 
     print("✅ 추천 완료!")
+    return {"model_version": model_version, "run_id": run_id, "recommendations": len(recommend_df)}
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     main()
\ No newline at end of file
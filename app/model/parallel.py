@@ -0,0 +1,113 @@
+import os
+import math
+import multiprocessing
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+import numpy as np
+import scipy.sparse as sp
+from app.model.recommender import SCORING_CHUNK_SIZE, score_users
+
+'''
+배치 추천 점수 계산 다중 프로세스 병렬화
+
+사용자/아이템 표현을 공유 메모리(multiprocessing.shared_memory)에 한 번만 올리고,
+워커 프로세스는 복사 없이 같은 버퍼를 numpy 배열로 붙여 사용자 shard 별 top-k 를 계산해 결과 공유 배열에 바로 기록한다.
+사용자별 top-k 는 서로 독립이므로 shard 결과를 사용자 순서대로 이어 붙이면 단일 프로세스(score_users) 결과와 같다.
+shard 경계는 SCORING_CHUNK_SIZE 의 배수로 맞춰 직렬 경로와 같은 chunk 로 계산한다.
+'''
+
+# 워커마다 BLAS 스레드를 1개로 제한 (프로세스 수 x BLAS 스레드로 코어를 초과 구독하지 않도록)
+_BLAS_THREAD_ENV = ["OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"]
+
+# 워커 프로세스에서 공유 메모리에 붙인 배열
+_worker_blocks = []
+_worker_arrays = {}
+
+def _create_block(blocks, shape, dtype):
+    dtype = np.dtype(dtype)
+    block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    blocks.append(block)
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf), (block.name, tuple(shape), dtype.str)
+
+def _init_worker(specs):
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        _worker_blocks.append(block)
+        _worker_arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+def _score_shard(task):
+    start, end, top_k, chunk_size = task
+    arrays = _worker_arrays
+    exclude = None
+    if "exclude_indptr" in arrays:
+        # 제외 행렬(CSR)의 shard 행만 복사 없이 다시 구성
+        indptr = arrays["exclude_indptr"][start:end + 1]
+        indices = arrays["exclude_indices"][indptr[0]:indptr[-1]]
+        exclude = sp.csr_matrix((np.ones(len(indices), dtype=np.int8), indices, indptr - indptr[0]),
+                                shape=(end - start, arrays["item_embeddings"].shape[0]))
+    top_indices, top_scores = score_users(
+        arrays["user_embeddings"][start:end], arrays["user_biases"][start:end],
+        arrays["item_embeddings"], arrays["item_biases"],
+        top_k=top_k, chunk_size=chunk_size, exclude=exclude
+    )
+    arrays["top_indices"][start:end] = top_indices
+    arrays["top_scores"][start:end] = top_scores
+    return end - start
+
+@contextmanager
+def _single_threaded_blas():
+    # spawn 된 워커는 시작 시점의 환경변수를 물려받음
+    previous = {key: os.environ.get(key) for key in _BLAS_THREAD_ENV}
+    os.environ.update({key: "1" for key in _BLAS_THREAD_ENV})
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+def shard_bounds(n_users, workers, chunk_size=SCORING_CHUNK_SIZE, shards_per_worker=4):
+    # 워커당 여러 shard 로 나눠 부하를 고르게 하되, 경계는 chunk_size 의 배수
+    shard_size = max(chunk_size, math.ceil(n_users / (workers * shards_per_worker) / chunk_size) * chunk_size)
+    return [(start, min(start + shard_size, n_users)) for start in range(0, n_users, shard_size)]
+
+def score_users_parallel(user_embeddings, user_biases, item_embeddings, item_biases, top_k=5, workers=2,
+                         chunk_size=SCORING_CHUNK_SIZE, exclude=None):
+    # exclude: score_users 와 같은 (사용자 x 아이템) 제외 행렬
+    n_users = user_embeddings.shape[0]
+    bounds = shard_bounds(n_users, workers, chunk_size)
+    if workers <= 1 or len(bounds) <= 1:
+        return score_users(user_embeddings, user_biases, item_embeddings, item_biases, top_k=top_k,
+                           chunk_size=chunk_size, exclude=exclude)
+
+    k = min(top_k, item_embeddings.shape[0])
+    inputs = {"user_embeddings": user_embeddings, "user_biases": user_biases,
+              "item_embeddings": item_embeddings, "item_biases": item_biases}
+    if exclude is not None:
+        exclude = sp.csr_matrix(exclude)
+        inputs.update(exclude_indptr=exclude.indptr, exclude_indices=exclude.indices)
+    blocks, views, specs = [], {}, {}
+    try:
+        for key, array in inputs.items():
+            views[key], specs[key] = _create_block(blocks, array.shape, array.dtype)
+            views[key][...] = array
+        views["top_indices"], specs["top_indices"] = _create_block(blocks, (n_users, k), np.int64)
+        views["top_scores"], specs["top_scores"] = _create_block(blocks, (n_users, k), np.float32)
+
+        with _single_threaded_blas():
+            pool = multiprocessing.get_context("spawn").Pool(
+                processes=min(workers, len(bounds)), initializer=_init_worker, initargs=(specs,)
+            )
+        with pool:
+            for _ in pool.imap_unordered(_score_shard, [(start, end, k, chunk_size) for start, end in bounds]):
+                pass
+
+        return views["top_indices"].copy(), views["top_scores"].copy()
+    finally:
+        # 공유 메모리를 참조하는 배열을 먼저 해제해야 close 가능
+        views.clear()
+        for block in blocks:
+            block.close()
+            block.unlink()
@@ -1,66 +1,238 @@
 import numpy as np
+from collections import defaultdict
+from functools import partial
 from datetime import datetime, timezone
 import pandas as pd
+import scipy.sparse as sp
 
 '''
 LightFM 모델을 기반으로 상위 브랜드 추천 결과를 생성
 '''
 
-def _predict_user_scores(user_index, model, item_indices, user_features, item_features):
-    scores = model.predict(
-        user_ids=np.repeat(user_index, len(item_indices)),
-        item_ids=np.array(item_indices),
-        user_features=user_features,
-        item_features=item_features
-    )
-    return scores
+# 한 번에 점수를 계산할 사용자 수 (chunk_size x 브랜드 수 크기의 점수 행렬만 메모리에 유지)
+SCORING_CHUNK_SIZE = 4096
 
-def _build_recommendation_result(user_id, scores, item_indices, index_to_brand_id, top_k):
-    top_k_indices = np.argsort(-scores)[:top_k]
-    now = datetime.now(timezone.utc)
-    return [
-        {
-            "user_id": user_id,
-            "brand_id": index_to_brand_id[item_indices[idx]],
-            "score": float(scores[idx]) * 100,
-            "rank": rank,
-            "created_at": now,
-            "updated_at": now
-        }
-        for rank, idx in enumerate(top_k_indices, start=1)
-    ]
-
-def generate_recommendations(user_df, brand_df, model, dataset, user_features, item_features, top_k=5, exclude_brand_ids=None):
-    _, _, item_mapping, _ = dataset.mapping()
-    index_to_brand_id = {v: k for k, v in item_mapping.items()}
+def _ids_by_row(id_mapping):
+    ids = [None] * len(id_mapping)
+    for external_id, row in id_mapping.items():
+        ids[row] = external_id
+    return np.asarray(ids)
 
-    if exclude_brand_ids:
-        item_indices = [idx for idx in index_to_brand_id if index_to_brand_id[idx] not in exclude_brand_ids]
-    else:
-        item_indices = list(index_to_brand_id.keys())
+def _lookup_row(lookup, external_id):
+    # 단건 조회는 get_indexer 보다 get_loc 이 빠름 (id 는 매핑에서 유일)
+    try:
+        return int(lookup.get_loc(external_id))
+    except (KeyError, TypeError):
+        return None
+
+def _prebuilt_index(values):
+    # pandas 인덱스의 해시 테이블은 첫 조회 때 만들어지고 그 과정이 스레드 안전하지 않으므로,
+    # API 점수 계산 스레드들이 공유하기 전에 미리 구성 (is_unique 확인이 해시 테이블을 채움)
+    index = pd.Index(values)
+    index.is_unique
+    return index
+
+class IdIndex:
+    '''
+    Dataset.mapping() 으로 만든 외부 id <-> LightFM 내부 행 번호 조회 인덱스
+    DataFrame 의 위치(index)가 아닌 Dataset 매핑 기준이라 로더의 정렬 순서가 바뀌어도 행이 어긋나지 않음
+    '''
+    def __init__(self, dataset):
+        user_id_map, _, item_id_map, _ = dataset.mapping()
+        self._init(_ids_by_row(user_id_map), _ids_by_row(item_id_map), user_id_map, item_id_map)
+
+    @classmethod
+    def from_ids(cls, user_ids, brand_ids):
+        # 행 순서대로 저장된 id 배열(mmap 배열 가능)로 구성, 단건 조회도 pandas 해시 인덱스 사용 (dict 를 만들지 않음)
+        index = cls.__new__(cls)
+        index._init(user_ids, brand_ids, None, None)
+        return index
+
+    def _init(self, user_ids, brand_ids, user_id_map, item_id_map):
+        self._user_id_map = user_id_map
+        self._item_id_map = item_id_map
+        self.user_ids = user_ids
+        self.brand_ids = brand_ids
+        self._user_lookup = _prebuilt_index(self.user_ids)
+        self._brand_lookup = _prebuilt_index(self.brand_ids)
+
+    def user_row(self, user_id):
+        if self._user_id_map is None:
+            return _lookup_row(self._user_lookup, user_id)
+        return self._user_id_map.get(user_id)
 
-    results = []
-    for user_id in user_df["user_id"]:
-        user_index = user_df[user_df["user_id"] == user_id].index[0]
-        scores = _predict_user_scores(user_index, model, item_indices, user_features, item_features)
-        results.extend(_build_recommendation_result(user_id, scores, item_indices, index_to_brand_id, top_k))
+    def brand_row(self, brand_id):
+        if self._item_id_map is None:
+            return _lookup_row(self._brand_lookup, brand_id)
+        return self._item_id_map.get(brand_id)
 
-    return pd.DataFrame(results)
+    def user_rows(self, user_ids):
+        # 매핑에 없는 id 는 -1
+        return self._user_lookup.get_indexer(user_ids)
 
-def generate_recommendation_for_user(user_id, user_df, brand_df, model, dataset, user_features, item_features, top_k=5, exclude_brand_ids=None):
-    _, _, item_mapping, _ = dataset.mapping()
-    index_to_brand_id = {v: k for k, v in item_mapping.items()}
+    def brand_rows(self, brand_ids):
+        return self._brand_lookup.get_indexer(brand_ids)
 
+def _candidate_item_indices(brand_ids, exclude_brand_ids, available_brand_ids=None):
+    mask = np.ones(len(brand_ids), dtype=bool)
     if exclude_brand_ids:
-        item_indices = [idx for idx in index_to_brand_id if index_to_brand_id[idx] not in exclude_brand_ids]
+        mask &= ~np.isin(brand_ids, np.fromiter(exclude_brand_ids, dtype=np.int64, count=len(exclude_brand_ids)))
+    # 증분 학습으로 매핑에 남아 있지만 현재 카탈로그에 없는 브랜드는 후보에서 제외
+    if available_brand_ids is not None:
+        mask &= np.isin(brand_ids, np.asarray(available_brand_ids))
+    return np.flatnonzero(mask)
+
+def _top_k(scores, top_k):
+    # 전체 정렬 대신 argpartition 으로 상위 k개만 고른 뒤 그 k개만 정렬
+    k = min(top_k, scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64), np.empty((scores.shape[0], 0), dtype=scores.dtype)
+
+    top_indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top_indices, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return np.take_along_axis(top_indices, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+def _build_recommendation_frame(user_ids, top_brand_ids, top_scores):
+    n_users, k = top_brand_ids.shape
+    now = datetime.now(timezone.utc)
+    return pd.DataFrame({
+        "user_id": np.repeat(np.asarray(user_ids), k),
+        "brand_id": top_brand_ids.ravel(),
+        "score": top_scores.ravel().astype(np.float64) * 100,
+        "rank": np.tile(np.arange(1, k + 1), n_users),
+        "created_at": now,
+        "updated_at": now
+    })
+
+def score_users(user_embeddings, user_biases, item_embeddings, item_biases, top_k=5, chunk_size=SCORING_CHUNK_SIZE, exclude=None):
+    # model.predict 와 동일한 점수(임베딩 내적 + 사용자/아이템 bias)를 사용자 chunk 단위 행렬곱으로 계산
+    # exclude: (사용자 x 아이템) sparse 행렬, 값이 있는 칸은 사용자별로 후보에서 제외 (예: 학습에 쓴 인터랙션)
+    n_users = user_embeddings.shape[0]
+    k = min(top_k, item_embeddings.shape[0])
+    top_indices = np.empty((n_users, k), dtype=np.int64)
+    top_scores = np.empty((n_users, k), dtype=np.float32)
+
+    for start in range(0, n_users, chunk_size):
+        end = min(start + chunk_size, n_users)
+        scores = user_embeddings[start:end] @ item_embeddings.T
+        scores += item_biases[np.newaxis, :]
+        scores += user_biases[start:end, np.newaxis]
+        if exclude is not None:
+            excluded = exclude[start:end].tocoo()
+            scores[excluded.row, excluded.col] = -np.inf
+        top_indices[start:end], top_scores[start:end] = _top_k(scores, k)
+
+    return top_indices, top_scores
+
+def similar_items(item_embeddings, top_n=10, block_size=SCORING_CHUNK_SIZE):
+    # 아이템 임베딩 코사인 유사도 기준 아이템별 상위 top_n 이웃 (자기 자신 제외)
+    # block_size 행씩 행렬곱해서 block_size x 아이템 수 크기의 유사도 행렬만 메모리에 유지
+    norms = np.linalg.norm(item_embeddings, axis=1, keepdims=True)
+    normalized = np.asarray(item_embeddings / np.maximum(norms, 1e-12), dtype=np.float32)
+    n_items = normalized.shape[0]
+    k = max(min(top_n, n_items - 1), 0)
+    neighbors = np.empty((n_items, k), dtype=np.int32)
+    scores = np.empty((n_items, k), dtype=np.float32)
+
+    for start in range(0, n_items, block_size):
+        end = min(start + block_size, n_items)
+        similarities = normalized[start:end] @ normalized.T
+        similarities[np.arange(end - start), np.arange(start, end)] = -np.inf
+        neighbors[start:end], scores[start:end] = _top_k(similarities, k)
+
+    return neighbors, scores
+
+def lookup_similar_brands(id_index, neighbors, scores, brand_id, limit=10):
+    # similar_items 결과에서 한 브랜드의 이웃 조회, 모델이 모르는 브랜드면 None
+    brand_row = id_index.brand_row(brand_id)
+    if brand_row is None:
+        return None
+    rows = neighbors[brand_row, :limit]
+    return [{"brand_id": _scalar(neighbor), "score": float(score)}
+            for neighbor, score in zip(id_index.brand_ids[rows], scores[brand_row, :limit])]
+
+def _scalar(value):
+    return value.item() if hasattr(value, "item") else value
+
+def generate_recommendations(user_df, brand_df, model, dataset, user_features, item_features, top_k=5, exclude_brand_ids=None, id_index=None, workers=1):
+    id_index = id_index or IdIndex(dataset)
+    item_indices = _candidate_item_indices(id_index.brand_ids, exclude_brand_ids, brand_df["brand_id"].to_numpy())
+
+    # 사용자/아이템 표현은 한 번만 계산
+    user_biases, user_embeddings = model.get_user_representations(user_features)
+    item_biases, item_embeddings = model.get_item_representations(item_features)
+
+    user_ids = user_df["user_id"].to_numpy()
+    user_rows = id_index.user_rows(user_ids)
+    known = user_rows >= 0
+    user_ids, user_rows = user_ids[known], user_rows[known]
+
+    # workers > 1 이면 사용자 shard 를 여러 프로세스에서 계산 (결과는 직렬 계산과 동일)
+    if workers > 1:
+        from app.model.parallel import score_users_parallel
+        scorer = partial(score_users_parallel, workers=workers)
     else:
-        item_indices = list(index_to_brand_id.keys())
+        scorer = score_users
+    top_indices, top_scores = scorer(
+        user_embeddings[user_rows], user_biases[user_rows],
+        item_embeddings[item_indices], item_biases[item_indices],
+        top_k=top_k
+    )
 
-    if user_id not in user_df["user_id"].values:
-        return pd.DataFrame([])
+    return _build_recommendation_frame(user_ids, id_index.brand_ids[item_indices][top_indices], top_scores)
 
-    user_index = user_df[user_df["user_id"] == user_id].index[0]
-    scores = _predict_user_scores(user_index, model, item_indices, user_features, item_features)
-    results = _build_recommendation_result(user_id, scores, item_indices, index_to_brand_id, top_k)
+def prepare_candidate_items(model, item_features, id_index, brand_df, exclude_brand_ids=None):
+    # 후보 브랜드 id 와 아이템 표현을 한 번만 계산해 사용자 shard 마다 재사용
+    item_indices = _candidate_item_indices(id_index.brand_ids, exclude_brand_ids, brand_df["brand_id"].to_numpy())
+    item_biases, item_embeddings = model.get_item_representations(item_features)
+    return id_index.brand_ids[item_indices], item_embeddings[item_indices], item_biases[item_indices]
+
+def recommend_from_user_features(user_ids, user_features, model, candidates, top_k=5):
+    # user_features: user_ids 순서의 사용자 피처 행렬 (build_user_feature_rows)
+    brand_ids, item_embeddings, item_biases = candidates
+    user_biases, user_embeddings = model.get_user_representations(user_features)
+    top_indices, top_scores = score_users(user_embeddings, user_biases, item_embeddings, item_biases, top_k=top_k)
+    return _build_recommendation_frame(user_ids, brand_ids[top_indices], top_scores)
+
+def build_feature_row(n_features, identity_col, feature_cols, features):
+    # Dataset.build_user_features 와 같은 방식(identity 피처 + 행 합 1 정규화)으로 한 명의 피처 행을 구성
+    # identity_col: 사용자 id 자체의 피처 열 (없으면 None), feature_cols: 피처 이름 -> 열 번호
+    weights = defaultdict(float)
+    if identity_col is not None:
+        weights[identity_col] += 1.0
+    feature_weights = features.items() if isinstance(features, dict) else ((feature, 1.0) for feature in features)
+    for feature, weight in feature_weights:
+        # 학습 시점에 없던 피처는 임베딩이 없으므로 무시
+        feature_index = feature_cols.get(feature)
+        if feature_index is not None:
+            weights[feature_index] += weight
+
+    cols = np.fromiter(weights.keys(), dtype=np.int32, count=len(weights))
+    data = np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+    if data.sum() > 0:
+        data /= data.sum()
+
+    return sp.csr_matrix((data, (np.zeros_like(cols), cols)), shape=(1, n_features))
+
+def build_user_feature_row(dataset, user_id, features, id_index=None):
+    # 배치 이후 새로 가입했거나 피처가 바뀐 사용자도 재학습 없이 점수를 계산할 수 있음
+    _, user_feature_map, _, _ = dataset.mapping()
+    id_index = id_index or IdIndex(dataset)
+    identity_col = user_feature_map.get(user_id) if id_index.user_row(user_id) is not None else None
+    return build_feature_row(len(user_feature_map), identity_col, user_feature_map, features)
+
+def generate_recommendation_from_artifact(user_id, features, artifact, top_k=5, exclude_brand_ids=None, available_brand_ids=None):
+    # artifact: store 의 ModelArtifact(pickle) 또는 MappedModelArtifact(mmap)
+    user_row = artifact.user_feature_row(user_id, features)
+    user_embedding = np.asarray(user_row @ artifact.user_embeddings, dtype=np.float32)
+    user_bias = np.asarray(user_row @ artifact.user_biases, dtype=np.float32)
+
+    item_indices = _candidate_item_indices(artifact.id_index.brand_ids, exclude_brand_ids, available_brand_ids)
+    top_indices, top_scores = score_users(
+        user_embedding, user_bias,
+        artifact.item_embeddings[item_indices], artifact.item_biases[item_indices],
+        top_k=top_k
+    )
 
-    return pd.DataFrame(results)
\ No newline at end of file
+    return _build_recommendation_frame([user_id], artifact.id_index.brand_ids[item_indices][top_indices], top_scores)
@@ -0,0 +1,340 @@
+import os
+import re
+import json
+import time
+import uuid
+import pickle
+import shutil
+import hashlib
+import logging
+import threading
+from datetime import datetime
+import numpy as np
+from app.config.settings import (
+    MODEL_DIR, MODEL_RELOAD_INTERVAL, MODEL_VERIFY_CHECKSUM, MODEL_KEEP_VERSIONS, SIMILAR_BRANDS_TOP_N,
+)
+from app.model.recommender import IdIndex, build_feature_row, build_user_feature_row, similar_items, lookup_similar_brands
+
+'''
+배치에서 학습한 LightFM 모델 아티팩트(모델, Dataset 매핑, 아이템 피처 행렬)를 버전별로 저장하고,
+API 서버가 시작 시 한 번 로드해서 재학습 없이 추천에 사용할 수 있도록 관리
+
+버전 디렉터리에는 두 가지 형식을 함께 저장한다.
+- artifact.pkl: 모델/Dataset 전체 (증분 학습에서 이전 모델을 이어 학습할 때 사용)
+- 서빙용 평면 배열(.npy) + manifest.json: 사용자 피처 임베딩/bias, 아이템 표현, id 매핑, 사용자 피처 어휘,
+  브랜드별 유사 브랜드 상위 SIMILAR_BRANDS_TOP_N 개 (이웃 행 번호/코사인 유사도)
+  API 는 np.load(mmap_mode="r") 로 열기 때문에 역직렬화 없이 바로 시작하고,
+  여러 uvicorn 워커가 같은 파일 페이지를 OS 페이지 캐시로 공유한다.
+manifest 는 배열 파일을 모두 쓴 뒤 마지막에 쓰고, manifest 의 checksum 으로 모델이 바뀌었는지 판단해 무중단 교체한다.
+
+버전(<시각>-<임의 접미어>)은 매번 새로 만들고, 임시 디렉터리에 모두 쓴 뒤 버전 디렉터리로 rename 하므로
+API 워커가 mmap 으로 열고 있는 기존 파일을 덮어쓰지 않는다. 최근 MODEL_KEEP_VERSIONS 개 버전만 남기고 나머지는 삭제한다.
+'''
+
+logger = logging.getLogger(__name__)
+
+LATEST_FILE = "LATEST"
+ARTIFACT_FILE = "artifact.pkl"
+MANIFEST_FILE = "manifest.json"
+TRAINING_CURVE_FILE = "training_curve.json"
+SERVING_FORMAT = 1
+
+VERSION_PATTERN = re.compile(r"\d{14}(-[0-9a-f]{8})?")
+
+_current_artifact = None
+_next_reload_check = 0.0
+_reload_lock = threading.Lock()
+
+
+class ModelArtifact:
+    def __init__(self, version, model, dataset, item_features, trained_until=None):
+        self.version = version
+        self.checksum = None
+        # 이 모델이 학습에 사용한 데이터의 기준 시각 (증분 학습 시 이후 데이터만 추가 학습)
+        self.trained_until = trained_until
+        self.model = model
+        self.dataset = dataset
+        self.item_features = item_features
+        self.user_embeddings = model.user_embeddings
+        self.user_biases = model.user_biases
+
+        # 아이템 표현은 요청마다 다시 계산하지 않도록 로드 시점에 한 번만 계산
+        self.item_biases, self.item_embeddings = model.get_item_representations(item_features)
+
+        # 외부 id -> 내부 행 번호 조회 인덱스는 모델과 함께 한 번만 구성
+        self.id_index = IdIndex(dataset)
+        self.brand_neighbors, self.brand_neighbor_scores = similar_items(self.item_embeddings, SIMILAR_BRANDS_TOP_N)
+
+    def user_feature_row(self, user_id, features):
+        return build_user_feature_row(self.dataset, user_id, features, self.id_index)
+
+    def similar_brands(self, brand_id, limit=10):
+        return lookup_similar_brands(self.id_index, self.brand_neighbors, self.brand_neighbor_scores, brand_id, limit)
+
+
+class MappedModelArtifact:
+    '''
+    manifest.json 과 평면 .npy 배열을 mmap 으로 연 서빙 전용 아티팩트 (읽기 전용, 학습 불가)
+    ModelArtifact 와 같은 속성(user/item 표현, id_index, user_feature_row)으로 추천 점수를 계산한다.
+    '''
+    def __init__(self, version, manifest, arrays):
+        self.version = version
+        self.manifest = manifest
+        self.checksum = manifest["checksum"]
+        trained_until = manifest.get("trained_until")
+        self.trained_until = datetime.fromisoformat(trained_until) if trained_until else None
+
+        self.user_embeddings = arrays["user_embeddings"]
+        self.user_biases = arrays["user_biases"]
+        self.item_embeddings = arrays["item_embeddings"]
+        self.item_biases = arrays["item_biases"]
+        self.id_index = IdIndex.from_ids(arrays["user_ids"], arrays["brand_ids"])
+        # 유사 브랜드 배열이 없는 이전 manifest 는 None
+        self.brand_neighbors = arrays.get("brand_neighbors")
+        self.brand_neighbor_scores = arrays.get("brand_neighbor_scores")
+
+        # identity 피처는 사용자 행 순서 배열로 조회하고, 이름이 있는 피처(어휘)만 dict 로 구성
+        self._identity_cols = arrays["user_identity_features"]
+        self._feature_cols = dict(zip(arrays["user_feature_names"].tolist(), arrays["user_feature_columns"].tolist()))
+
+    def user_feature_row(self, user_id, features):
+        user_row = self.id_index.user_row(user_id)
+        identity_col = None
+        if user_row is not None and self._identity_cols[user_row] >= 0:
+            identity_col = int(self._identity_cols[user_row])
+        return build_feature_row(self.user_embeddings.shape[0], identity_col, self._feature_cols, features)
+
+    def similar_brands(self, brand_id, limit=10):
+        if self.brand_neighbors is None:
+            raise LookupError(f"모델 {self.version} 에는 유사 브랜드 배열이 없습니다.")
+        return lookup_similar_brands(self.id_index, self.brand_neighbors, self.brand_neighbor_scores, brand_id, limit)
+
+
+def _new_version():
+    # 같은 초에 저장해도 겹치지 않도록 임의 접미어 추가 (이름순 = 시간순)
+    return f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def _flat_ids(ids, kind):
+    ids = np.asarray(ids)
+    if ids.dtype == object:
+        raise ValueError(f"{kind} 는 숫자형이어야 mmap 배열로 저장할 수 있습니다.")
+    return ids
+
+
+def _serving_arrays(model, dataset, item_features):
+    user_id_map, user_feature_map, _, _ = dataset.mapping()
+    id_index = IdIndex(dataset)
+    item_biases, item_embeddings = model.get_item_representations(item_features)
+
+    # Dataset 의 사용자 피처 매핑 = 사용자 id(identity 피처) + 피처 이름
+    identity_cols = np.fromiter((user_feature_map.get(user_id, -1) for user_id in id_index.user_ids),
+                                dtype=np.int64, count=len(id_index.user_ids))
+    named = [(feature, col) for feature, col in user_feature_map.items() if feature not in user_id_map]
+    brand_neighbors, brand_neighbor_scores = similar_items(item_embeddings, SIMILAR_BRANDS_TOP_N)
+
+    return {
+        "user_embeddings": np.asarray(model.user_embeddings, dtype=np.float32),
+        "user_biases": np.asarray(model.user_biases, dtype=np.float32),
+        "item_embeddings": np.asarray(item_embeddings, dtype=np.float32),
+        "item_biases": np.asarray(item_biases, dtype=np.float32),
+        "user_ids": _flat_ids(id_index.user_ids, "user_id"),
+        "brand_ids": _flat_ids(id_index.brand_ids, "brand_id"),
+        "user_identity_features": identity_cols,
+        "user_feature_names": np.array([str(feature) for feature, _ in named], dtype=str),
+        "user_feature_columns": np.array([col for _, col in named], dtype=np.int64),
+        "brand_neighbors": brand_neighbors,
+        "brand_neighbor_scores": brand_neighbor_scores,
+    }
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_serving_arrays(version_dir, version, arrays, trained_until=None):
+    files = {}
+    for name, array in arrays.items():
+        path = os.path.join(version_dir, f"{name}.npy")
+        np.save(path, np.ascontiguousarray(array), allow_pickle=False)
+        files[name] = {"file": f"{name}.npy", "dtype": array.dtype.str, "shape": list(array.shape),
+                       "sha256": _file_sha256(path)}
+
+    checksum = hashlib.sha256(
+        json.dumps({name: spec["sha256"] for name, spec in files.items()}, sort_keys=True).encode()
+    ).hexdigest()
+    manifest = {
+        "format": SERVING_FORMAT,
+        "version": version,
+        "trained_until": trained_until.isoformat() if trained_until is not None else None,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "checksum": checksum,
+        "arrays": files,
+    }
+
+    # manifest 가 있으면 배열 파일이 모두 쓰인 것으로 간주
+    manifest_path = os.path.join(version_dir, MANIFEST_FILE)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def _cleanup_versions(model_dir, keep, latest):
+    # 같은 초에 저장된 버전은 접미어가 임의라 디렉터리 수정 시각으로 순서 결정
+    versions = sorted((name for name in os.listdir(model_dir)
+                       if VERSION_PATTERN.fullmatch(name) and os.path.isdir(os.path.join(model_dir, name))),
+                      key=lambda name: (name[:14], os.path.getmtime(os.path.join(model_dir, name))))
+    for version in versions[:-keep] if keep > 0 else versions:
+        if version == latest:
+            continue
+        shutil.rmtree(os.path.join(model_dir, version), ignore_errors=True)
+        logger.info(f"🧹 이전 모델 아티팩트 삭제: {version}")
+
+
+def save_model_artifact(model, dataset, item_features, model_dir=None, trained_until=None, training_curve=None,
+                        keep_versions=MODEL_KEEP_VERSIONS):
+    model_dir = model_dir or MODEL_DIR
+    version = _new_version()
+    version_dir = os.path.join(model_dir, version)
+    if os.path.exists(version_dir):
+        raise FileExistsError(f"모델 버전 디렉터리가 이미 있습니다: {version_dir}")
+
+    # 임시 디렉터리에 모두 쓴 뒤 버전 디렉터리로 rename (반쯤 쓰인 버전이 보이지 않도록)
+    tmp_dir = os.path.join(model_dir, f".{version}.tmp")
+    os.makedirs(tmp_dir)
+    try:
+        with open(os.path.join(tmp_dir, ARTIFACT_FILE), "wb") as f:
+            pickle.dump({"model": model, "dataset": dataset, "item_features": item_features,
+                         "trained_until": trained_until}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+        # API 서빙용 평면 배열 + manifest
+        manifest = _write_serving_arrays(tmp_dir, version, _serving_arrays(model, dataset, item_features), trained_until)
+
+        # 조기 종료 학습 곡선(epoch 별 검증 지표) 기록
+        if training_curve:
+            with open(os.path.join(tmp_dir, TRAINING_CURVE_FILE), "w") as f:
+                json.dump(training_curve, f, indent=2)
+
+        os.rename(tmp_dir, version_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # LATEST 포인터는 임시 파일에 쓴 뒤 교체해서 로딩 중인 서버가 반쯤 쓰인 파일을 읽지 않도록 함
+    latest_path = os.path.join(model_dir, LATEST_FILE)
+    tmp_path = f"{latest_path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, latest_path)
+
+    logger.info(f"📦 모델 아티팩트 저장 완료: {version_dir} (checksum={manifest['checksum'][:12]})")
+    _cleanup_versions(model_dir, keep_versions, version)
+    return version
+
+
+def _latest_version(model_dir):
+    latest_path = os.path.join(model_dir, LATEST_FILE)
+    if not os.path.exists(latest_path):
+        raise FileNotFoundError(f"모델 아티팩트가 없습니다: {latest_path}")
+    with open(latest_path) as f:
+        return f.read().strip()
+
+
+def load_model_artifact(model_dir=None, version=None):
+    model_dir = model_dir or MODEL_DIR
+    version = version or _latest_version(model_dir)
+
+    with open(os.path.join(model_dir, version, ARTIFACT_FILE), "rb") as f:
+        payload = pickle.load(f)
+
+    return ModelArtifact(version, payload["model"], payload["dataset"], payload["item_features"],
+                         payload.get("trained_until"))
+
+
+def read_manifest(model_dir=None, version=None):
+    model_dir = model_dir or MODEL_DIR
+    version = version or _latest_version(model_dir)
+    manifest_path = os.path.join(model_dir, version, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def load_serving_artifact(model_dir=None, version=None, verify=None):
+    # manifest 가 없는 이전 형식 버전은 pickle 로 로드
+    model_dir = model_dir or MODEL_DIR
+    version = version or _latest_version(model_dir)
+    verify = MODEL_VERIFY_CHECKSUM if verify is None else verify
+
+    manifest = read_manifest(model_dir, version)
+    if manifest is None:
+        logger.warning(f"모델 {version} 에 {MANIFEST_FILE} 이 없어 pickle 아티팩트로 로드합니다.")
+        return load_model_artifact(model_dir, version)
+    if manifest.get("format") != SERVING_FORMAT:
+        raise ValueError(f"지원하지 않는 모델 아티팩트 형식입니다: {manifest.get('format')}")
+
+    arrays = {}
+    for name, spec in manifest["arrays"].items():
+        path = os.path.join(model_dir, version, spec["file"])
+        if verify and _file_sha256(path) != spec["sha256"]:
+            raise ValueError(f"모델 배열 체크섬 불일치: {path}")
+        # 파일 크기가 header 의 shape 보다 작으면 np.load 가 실패하므로 잘린 파일도 여기서 걸러짐
+        array = np.load(path, mmap_mode="r", allow_pickle=False)
+        if array.dtype.str != spec["dtype"] or list(array.shape) != spec["shape"]:
+            raise ValueError(f"모델 배열 형식이 manifest 와 다릅니다: {path}")
+        arrays[name] = array
+
+    return MappedModelArtifact(version, manifest, arrays)
+
+
+def get_model_artifact():
+    return _current_artifact
+
+
+def _is_current(version, checksum):
+    current = _current_artifact
+    return current is not None and current.version == version and current.checksum == checksum
+
+
+def refresh_model_artifact(model_dir=None):
+    # 같은 버전/체크섬이면 다시 열지 않음, 교체는 참조 한 번으로 이뤄져 진행 중인 요청은 이전 아티팩트를 계속 사용
+    global _current_artifact
+    model_dir = model_dir or MODEL_DIR
+    version = _latest_version(model_dir)
+    manifest = read_manifest(model_dir, version)
+    if _is_current(version, manifest["checksum"] if manifest else None):
+        return _current_artifact
+
+    start = time.perf_counter()
+    _current_artifact = load_serving_artifact(model_dir, version)
+    logger.info(f"🔄 모델 아티팩트 로드 완료 (version={_current_artifact.version}, "
+                f"{(time.perf_counter() - start) * 1000:.1f}ms)")
+    return _current_artifact
+
+
+def reload_model_artifact_if_changed(model_dir=None, interval=None):
+    # MODEL_RELOAD_INTERVAL 마다 LATEST/manifest 를 확인해 바뀐 경우에만 교체, 실패하면 현재 모델 유지
+    global _next_reload_check
+    interval = MODEL_RELOAD_INTERVAL if interval is None else interval
+    if time.monotonic() < _next_reload_check:
+        return _current_artifact
+
+    with _reload_lock:
+        if time.monotonic() < _next_reload_check:
+            return _current_artifact
+        try:
+            refresh_model_artifact(model_dir)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"모델 아티팩트 교체 실패, 현재 모델을 유지합니다: {e}")
+        _next_reload_check = time.monotonic() + interval
+    return _current_artifact
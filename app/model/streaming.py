@@ -0,0 +1,90 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from app.config.settings import BATCH_SHARD_SIZE
+from app.data.loader import iter_user_shards, load_user_brand_data, load_bookmark_data
+from app.features.builder import brand_category_lookup, build_user_feature_triples
+from app.features.matrix import build_user_feature_rows
+from app.model.recommender import IdIndex, prepare_candidate_items, recommend_from_user_features
+from app.saver.db_saver import replace_recommendation_statistics, delete_stale_recommendation_statistics
+from app.saver.snapshot import (
+    new_run_id,
+    begin_staging,
+    append_staged_recommendations,
+    complete_staging,
+    publish_recommendations,
+)
+from app.utils.statistics import prepare_statistics_df
+
+'''
+학습 이후 추천 생성/저장을 사용자 shard 단위로 스트리밍
+
+사용자를 서버 측 커서로 BATCH_SHARD_SIZE 명씩 읽어, shard 사용자의 관심/방문/즐겨찾기만 조회해 피처를 만들고
+점수 계산 후 곧바로 스테이징 테이블과 통계 테이블에 기록한다. 메모리에는 shard 하나 분량만 올라가므로
+사용자 수가 늘어도 사용량이 일정하다. 저장은 별도 스레드에서 실행해 다음 shard 점수 계산과 겹치게 한다.
+모든 shard 적재가 끝나면 스냅샷 교체(snapshot.publish_recommendations)로 한 번에 공개한다.
+'''
+
+logger = logging.getLogger(__name__)
+
+def _score_shard(conn, user_df, model, dataset, id_index, candidates, brand_df, brand_to_category, exclude_brand_ids, top_k):
+    user_ids = user_df["user_id"].to_numpy()
+    user_ids = user_ids[id_index.user_rows(user_ids) >= 0]
+    if len(user_ids) == 0:
+        return None
+
+    shard_ids = user_ids.tolist()
+    user_brand_df = load_user_brand_data(conn, user_ids=shard_ids)
+    bookmark_df = load_bookmark_data(conn, user_ids=shard_ids)
+    triples = build_user_feature_triples(user_brand_df, bookmark_df, brand_df, exclude_brand_ids=exclude_brand_ids,
+                                         brand_to_category=brand_to_category)
+    user_features = build_user_feature_rows(dataset, user_ids, triples)
+    return recommend_from_user_features(user_ids, user_features, model, candidates, top_k=top_k)
+
+def _flush_shard(engine, run_id, recommend_df, brand_df):
+    saved = append_staged_recommendations(engine, run_id, recommend_df)
+    statistics_df = prepare_statistics_df(recommend_df, brand_df)
+    try:
+        replace_recommendation_statistics(engine, statistics_df, user_ids=recommend_df["user_id"].unique())
+    except Exception as e:
+        logger.warning(f"추천 통계 저장 중 오류 발생: {e}")
+    return saved
+
+def stream_recommendations(engine, model, dataset, item_features, brand_df, exclude_brand_ids=None, id_index=None,
+                           shard_size=BATCH_SHARD_SIZE, top_k=5, run_id=None):
+    id_index = id_index or IdIndex(dataset)
+    candidates = prepare_candidate_items(model, item_features, id_index, brand_df, exclude_brand_ids)
+    brand_to_category = brand_category_lookup(brand_df)
+
+    run_id = run_id or new_run_id()
+    begin_staging(engine, run_id)
+    started_at = datetime.now()
+    shards = users = rows = 0
+
+    # 읽기 커서, shard 조회, 저장(스레드)은 각각 별도 커넥션 사용
+    with engine.connect() as stream_conn, engine.connect() as shard_conn, \
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="shard-writer") as writer:
+        pending = None
+        for user_df in iter_user_shards(stream_conn, shard_size):
+            start = time.perf_counter()
+            recommend_df = _score_shard(shard_conn, user_df, model, dataset, id_index, candidates, brand_df,
+                                        brand_to_category, exclude_brand_ids, top_k)
+            shards += 1
+            users += len(user_df)
+            if recommend_df is None:
+                continue
+
+            # 이전 shard 저장이 끝나야 다음 저장 시작 (메모리에는 최대 2개 shard)
+            if pending is not None:
+                rows += pending.result()
+            pending = writer.submit(_flush_shard, engine, run_id, recommend_df, brand_df)
+            logger.info(f"🧩 shard {shards}: 사용자 {len(user_df)}명, 추천 {len(recommend_df)}건 ({time.perf_counter() - start:.2f}s)")
+
+        if pending is not None:
+            rows += pending.result()
+
+    complete_staging(engine, run_id, rows)
+    publish_recommendations(engine, run_id)
+    delete_stale_recommendation_statistics(engine, before=started_at)
+    return {"run_id": run_id, "shards": shards, "users": users, "recommendations": rows}
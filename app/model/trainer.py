@@ -1,26 +1,30 @@
-from lightfm.data import Dataset
+import copy
+import logging
+from collections import defaultdict
+import numpy as np
+import scipy.sparse as sp
+from app.config.settings import (
+    INCREMENTAL_EPOCHS,
+    NUM_THREADS,
+    MAX_EPOCHS,
+    EPOCH_CHUNK,
+    VALIDATION_RATIO,
+    EARLY_STOPPING_METRIC,
+    EARLY_STOPPING_MIN_DELTA,
+    EARLY_STOPPING_PATIENCE,
+    EARLY_STOPPING_REFIT,
+)
+from app.model.recommender import score_users
+from app.utils.evaluator import evaluate_metrics
 
 '''
-LightFM 모델 학습을 위한 데이터셋 구성, 상호작용 행렬 생성, 모델 학습을 수행하는 전체 파이프라인 함수들을 정의
+LightFM 모델 학습(고정 epoch, 조기 종료, 이어서 학습)을 수행하는 함수들을 정의
+(데이터셋/행렬 구성은 app.features.matrix)
 '''
 
-def prepare_dataset(user_df, brand_df, user_feature_map, item_feature_map=None):
-    dataset = Dataset()
+logger = logging.getLogger(__name__)
 
-    user_ids = user_df["user_id"].tolist()
-    item_ids = brand_df["brand_id"].tolist()
-
-    # 전체 feature 목록 수집
-    user_features = set(f for feats in user_feature_map.values() for f in feats)
-    item_features = set(f for feats in item_feature_map.values() for f in feats) if item_feature_map else []
-
-    dataset.fit(users=user_ids, items=item_ids,
-                user_features=user_features,
-                item_features=item_features)
-
-    return dataset
-
-def train_model(interactions, weights, user_features, item_features):
+def train_model(interactions, weights, user_features, item_features, num_threads=NUM_THREADS, epochs=MAX_EPOCHS):
     from lightfm import LightFM
 
     model = LightFM(loss="warp", random_state=42)
@@ -28,6 +32,144 @@ def train_model(interactions, weights, user_features, item_features):
               sample_weight=weights,
               user_features=user_features,
               item_features=item_features,
-              epochs=100,
-              num_threads=4)
-    return model
\ No newline at end of file
+              epochs=epochs,
+              num_threads=num_threads)
+    return model
+
+def _coo_subset(matrix, mask):
+    return sp.coo_matrix((matrix.data[mask], (matrix.row[mask], matrix.col[mask])), shape=matrix.shape)
+
+def split_interactions(interactions, weights, validation_ratio=VALIDATION_RATIO, random_state=42):
+    # (사용자, 브랜드) 쌍 단위로 검증 세트를 분리 (interactions/weights 는 같은 순서로 만들어진 COO)
+    # 중복 항목(예: 같은 브랜드가 관심 + 방문)은 합치지 않은 COO 이므로, 한 쌍의 항목은 모두 같은 쪽으로 보내야
+    # 학습/검증 세트가 겹치지 않음 (auc_score 는 겹치면 예외)
+    interactions = interactions.tocoo()
+    weights = weights.tocoo()
+    pair_keys = interactions.row.astype(np.int64) * interactions.shape[1] + interactions.col
+    _, pair_index = np.unique(pair_keys, return_inverse=True)
+    is_validation_pair = np.random.RandomState(random_state).rand(pair_index.max() + 1 if len(pair_index) else 0) < validation_ratio
+    is_validation = is_validation_pair[pair_index]
+
+    return (
+        _coo_subset(interactions, ~is_validation),
+        _coo_subset(weights, ~is_validation),
+        _coo_subset(interactions, is_validation),
+    )
+
+def validation_metrics(model, train_interactions, validation_interactions, user_features, item_features, k=5, num_threads=NUM_THREADS):
+    from lightfm.evaluation import auc_score
+
+    train = train_interactions.tocsr()
+    validation = validation_interactions.tocsr()
+    users = np.flatnonzero(np.diff(validation.indptr))
+    if len(users) == 0:
+        return {}
+
+    # 학습에 사용한 인터랙션은 제외하고 검증 사용자별 Top-K 를 계산
+    user_biases, user_embeddings = model.get_user_representations(user_features)
+    item_biases, item_embeddings = model.get_item_representations(item_features)
+    top_indices, _ = score_users(user_embeddings[users], user_biases[users], item_embeddings, item_biases,
+                                 top_k=k, exclude=train[users])
+
+    scores = defaultdict(list)
+    for row, user in enumerate(users):
+        ground_truth = validation.indices[validation.indptr[user]:validation.indptr[user + 1]].tolist()
+        for name, value in evaluate_metrics(top_indices[row].tolist(), ground_truth, k=k).items():
+            scores[name].append(value)
+
+    metrics = {name: float(np.mean(values)) for name, values in scores.items()}
+    metrics["auc"] = float(np.mean(auc_score(model, validation_interactions, train_interactions=train_interactions,
+                                             user_features=user_features, item_features=item_features,
+                                             num_threads=num_threads)))
+    return metrics
+
+def train_model_early_stopping(interactions, weights, user_features, item_features, k=5, num_threads=NUM_THREADS,
+                               refit=EARLY_STOPPING_REFIT):
+    # 검증 세트를 떼어 EPOCH_CHUNK 단위로 학습하고, 지표 개선이 멈추면 가장 좋았던 epoch 을 선택
+    # refit 이면 그 epoch 수만큼 전체 인터랙션으로 다시 학습 (학습 시간이 늘어나는 대신 검증 세트 인터랙션도 반영),
+    # 아니면 학습 세트(1 - VALIDATION_RATIO)로 학습한 가장 좋았던 시점의 모델을 그대로 사용
+    from lightfm import LightFM
+
+    train_interactions, train_weights, validation_interactions = split_interactions(interactions, weights)
+    if validation_interactions.nnz == 0:
+        return train_model(interactions, weights, user_features, item_features, num_threads=num_threads), []
+
+    model = LightFM(loss="warp", random_state=42)
+    best_model, best_score, best_epoch = None, -np.inf, 0
+    training_curve = []
+    stale_chunks = 0
+    epoch = 0
+
+    while epoch < MAX_EPOCHS:
+        chunk = min(EPOCH_CHUNK, MAX_EPOCHS - epoch)
+        model.fit_partial(train_interactions,
+                          sample_weight=train_weights,
+                          user_features=user_features,
+                          item_features=item_features,
+                          epochs=chunk,
+                          num_threads=num_threads)
+        epoch += chunk
+
+        metrics = validation_metrics(model, train_interactions, validation_interactions, user_features, item_features,
+                                     k=k, num_threads=num_threads)
+        training_curve.append({"epoch": epoch, **metrics})
+        logger.info(f"📈 epoch {epoch}: " + ", ".join(f"{name}={value:.4f}" for name, value in metrics.items()))
+
+        score = metrics[EARLY_STOPPING_METRIC]
+        if best_model is None or score > best_score + EARLY_STOPPING_MIN_DELTA:
+            best_model, best_score, best_epoch = copy.deepcopy(model), score, epoch
+            stale_chunks = 0
+        else:
+            stale_chunks += 1
+            if stale_chunks >= EARLY_STOPPING_PATIENCE:
+                break
+
+    logger.info(f"🏁 조기 종료: best epoch {best_epoch} ({EARLY_STOPPING_METRIC}={best_score:.4f})")
+    if refit:
+        logger.info(f"🔁 전체 인터랙션으로 {best_epoch} epoch 재학습")
+        best_model = train_model(interactions, weights, user_features, item_features, num_threads=num_threads, epochs=best_epoch)
+    return best_model, training_curve
+
+def _grow_rows(array, n_rows, fill):
+    n_new = n_rows - array.shape[0]
+    if n_new <= 0:
+        return array
+    return np.concatenate([array, np.full((n_new,) + array.shape[1:], fill, dtype=array.dtype)])
+
+def _grow_embeddings(model, prefix, n_features):
+    embeddings = getattr(model, f"{prefix}_embeddings")
+    n_new = n_features - embeddings.shape[0]
+    if n_new < 0:
+        raise ValueError(f"{prefix} 피처 수가 기존 모델보다 적습니다: {n_features} < {embeddings.shape[0]}")
+    if n_new == 0:
+        return
+
+    # LightFM._initialize 와 같은 방식으로 새 피처 행만 초기화 (adagrad 누적 gradient 는 1 로 시작)
+    new_embeddings = ((model.random_state.rand(n_new, model.no_components) - 0.5) / model.no_components).astype(np.float32)
+    gradient_fill = 1.0 if model.learning_schedule == "adagrad" else 0.0
+
+    setattr(model, f"{prefix}_embeddings", np.concatenate([embeddings, new_embeddings]))
+    for name, fill in [("embedding_gradients", gradient_fill), ("embedding_momentum", 0.0),
+                       ("biases", 0.0), ("bias_gradients", gradient_fill), ("bias_momentum", 0.0)]:
+        attr = f"{prefix}_{name}"
+        setattr(model, attr, _grow_rows(getattr(model, attr), n_features, fill))
+
+def resize_model(model, n_user_features, n_item_features):
+    # Dataset.fit_partial 로 늘어난 사용자/아이템 피처 수에 맞춰 기존 임베딩을 유지한 채 행을 추가
+    _grow_embeddings(model, "user", n_user_features)
+    _grow_embeddings(model, "item", n_item_features)
+    return model
+
+def train_model_incremental(model, interactions, weights, user_features, item_features, epochs=INCREMENTAL_EPOCHS,
+                            num_threads=NUM_THREADS):
+    # 이전 배치 모델을 이어서 신규 인터랙션만 fit_partial 로 추가 학습
+    resize_model(model, user_features.shape[1], item_features.shape[1])
+    if interactions.nnz == 0:
+        return model
+    model.fit_partial(interactions,
+                      sample_weight=weights,
+                      user_features=user_features,
+                      item_features=item_features,
+                      epochs=epochs,
+                      num_threads=num_threads)
+    return model
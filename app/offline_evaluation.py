@@ -0,0 +1,207 @@
+import argparse
+import logging
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from app.config.database import get_engine
+from app.config.settings import EARLY_STOPPING, SCORING_PROCESSES, OFFLINE_EVAL_REPORT_DIR, resolve_num_threads
+from app.data.loader import (
+    load_user_data,
+    load_brand_data,
+    load_user_brand_data,
+    load_bookmark_data,
+    load_exclude_brands,
+    load_timed_action_logs,
+    load_timed_visits,
+    aggregate_action_logs,
+)
+from app.features.builder import build_user_feature_triples, build_item_feature_triples, build_interaction_triples
+from app.features.matrix import fit_dataset, build_user_feature_matrix, build_item_feature_matrix, build_interaction_matrices
+from app.model.trainer import train_model, train_model_early_stopping
+from app.model.recommender import IdIndex
+from app.model.parallel import score_users_parallel
+from app.utils.evaluator import ranking_metrics
+from app.utils.pipeline import PipelineRun
+
+'''
+시간 기준 분할 오프라인 평가
+
+action_logs(created_at) / history(visited_at) 를 기준 시각(cutoff)으로 나눠 과거 데이터만으로 배치와 같은 방식으로 학습하고,
+기준 시각 이후에 사용자가 실제로 반응한 브랜드(행동 로그 + 방문)를 정답으로 precision/recall/hit/NDCG/MAP/coverage@k 를 계산한다.
+점수 계산은 배치와 같은 다중 프로세스 scoring(score_users_parallel)을 사용하고, 지표는 사용자 전체에 대해 배열 연산으로 계산한다.
+학습/점수 계산 시간, 처리량, 최대 메모리를 품질 지표와 함께 JSON 리포트(OFFLINE_EVAL_REPORT_DIR)로 남겨
+성능 변경마다 품질 비용을 같은 기준으로 비교할 수 있게 한다.
+
+- 관심(INTEREST) 브랜드와 즐겨찾기는 시각 정보가 없어 학습 쪽 정적 피처로 사용한다.
+- 사용자별 EXCLUDE 브랜드는 추천 후보에서 제외한다. (--exclude-seen 이면 학습에 쓴 인터랙션도 제외)
+
+    python -m app.offline_evaluation --test-days 7 --k 5,10,20 --workers auto
+'''
+
+def _parse_cutoff(value):
+    return datetime.fromisoformat(value) if value else None
+
+def resolve_cutoff(action_logs, visits, cutoff=None, test_days=7):
+    # 기준 시각이 없으면 가장 최근 기록에서 test_days 만큼 이전
+    if cutoff is not None:
+        return cutoff
+    latest = pd.concat([action_logs["created_at"], visits["visited_at"]]).max()
+    if pd.isna(latest):
+        raise ValueError("시각 정보가 있는 행동 로그/방문 이력이 없어 시간 기준 분할을 할 수 없습니다.")
+    return pd.Timestamp(latest).to_pydatetime() - timedelta(days=test_days)
+
+def split_by_time(action_logs, visits, cutoff):
+    past_logs = action_logs[action_logs["created_at"] < cutoff]
+    past_visits = visits[visits["visited_at"] < cutoff]
+    future = pd.concat([
+        action_logs.loc[action_logs["created_at"] >= cutoff, ["user_id", "brand_id"]],
+        visits.loc[visits["visited_at"] >= cutoff, ["user_id", "brand_id"]],
+    ], ignore_index=True).drop_duplicates(ignore_index=True)
+    return past_logs, past_visits, future
+
+def _training_user_brands(user_brand_df, past_visits):
+    # 관심 브랜드는 그대로, 방문(RECENT)은 기준 시각 이전 방문만
+    interest = user_brand_df.loc[user_brand_df["data_type"] == "INTEREST", ["user_id", "brand_id", "data_type"]]
+    recent = past_visits[["user_id", "brand_id"]].drop_duplicates().assign(data_type="RECENT")
+    return pd.concat([interest, recent], ignore_index=True)
+
+def _pair_matrix(user_rows, brand_rows, shape):
+    valid = (user_rows >= 0) & (brand_rows >= 0)
+    matrix = sp.csr_matrix((np.ones(valid.sum(), dtype=np.int8), (user_rows[valid], brand_rows[valid])), shape=shape)
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+def run_offline_evaluation(engine, cutoff=None, test_days=7, ks=(5, 10), workers=SCORING_PROCESSES, epochs=None,
+                           exclude_seen=False, run=None):
+    run = run or PipelineRun()
+
+    with engine.connect() as conn:
+        with run.stage("load") as stage:
+            print("📥 평가 데이터 로딩 중...")
+            user_df = load_user_data(conn)
+            brand_df = load_brand_data(conn)
+            user_brand_df = load_user_brand_data(conn)
+            bookmark_df = load_bookmark_data(conn)
+            exclude_brand_df = load_exclude_brands(conn)
+            action_logs = load_timed_action_logs(conn)
+            visits = load_timed_visits(conn)
+            stage["rows"] = {"users": len(user_df), "brands": len(brand_df), "action_logs": len(action_logs), "visits": len(visits)}
+
+    with run.stage("split") as stage:
+        cutoff = resolve_cutoff(action_logs, visits, cutoff, test_days)
+        past_logs, past_visits, future = split_by_time(action_logs, visits, cutoff)
+        interaction_df = aggregate_action_logs(past_logs)
+        training_user_brand_df = _training_user_brands(user_brand_df, past_visits)
+        stage["rows"] = {"train_action_logs": len(past_logs), "train_visits": len(past_visits), "test_pairs": len(future)}
+        print(f"✂️ 기준 시각 {cutoff}: 학습 로그 {len(past_logs)}건, 평가 정답 {len(future)}건")
+
+    with run.stage("build_features") as stage:
+        print("🛠️ 피처/데이터셋 구성 중...")
+        exclude_brand_ids = set(exclude_brand_df["brand_id"].tolist())
+        user_feature_triples = build_user_feature_triples(training_user_brand_df, bookmark_df, brand_df,
+                                                          exclude_brand_ids=exclude_brand_ids)
+        item_feature_triples = build_item_feature_triples(brand_df)
+        dataset = fit_dataset(user_df["user_id"], brand_df["brand_id"], user_feature_triples, item_feature_triples)
+        id_index = IdIndex(dataset)
+        item_features = build_item_feature_matrix(dataset, item_feature_triples)
+        user_features = build_user_feature_matrix(dataset, user_feature_triples)
+        interactions, weights = build_interaction_matrices(
+            dataset, build_interaction_triples(interaction_df, training_user_brand_df, brand_df)
+        )
+        stage["rows"] = interactions.nnz
+
+    with run.stage("train") as train_stage:
+        print("🧠 LightFM 모델 학습 중...")
+        if epochs is not None:
+            model = train_model(interactions, weights, user_features, item_features, epochs=epochs)
+        elif EARLY_STOPPING:
+            model, training_curve = train_model_early_stopping(interactions, weights, user_features, item_features)
+            train_stage["epochs"] = training_curve[-1].get("epoch") if training_curve else None
+        else:
+            model = train_model(interactions, weights, user_features, item_features)
+        train_stage["rows"] = interactions.nnz
+
+    with run.stage("score") as score_stage:
+        print("📊 평가 사용자 추천 점수 계산 중...")
+        # 정답이 있고 모델이 아는 사용자/브랜드만 평가
+        n_brands = len(id_index.brand_ids)
+        future_users = id_index.user_rows(future["user_id"])
+        future_brands = id_index.brand_rows(future["brand_id"])
+        known = (future_users >= 0) & (future_brands >= 0)
+        eval_user_rows = np.unique(future_users[known])
+        eval_index = pd.Index(eval_user_rows)
+        truth = _pair_matrix(eval_index.get_indexer(future_users[known]), future_brands[known], (len(eval_user_rows), n_brands))
+
+        excluded = _pair_matrix(eval_index.get_indexer(id_index.user_rows(exclude_brand_df["user_id"])),
+                                id_index.brand_rows(exclude_brand_df["brand_id"]), truth.shape)
+        if exclude_seen:
+            excluded = excluded + (interactions.tocsr()[eval_user_rows] > 0)
+
+        user_biases, user_embeddings = model.get_user_representations(user_features)
+        item_biases, item_embeddings = model.get_item_representations(item_features)
+        top_indices, _ = score_users_parallel(
+            user_embeddings[eval_user_rows], user_biases[eval_user_rows], item_embeddings, item_biases,
+            top_k=max(ks), workers=workers, exclude=excluded if excluded.nnz else None
+        )
+        score_stage["rows"] = len(eval_user_rows)
+        score_stage["workers"] = workers
+
+    with run.stage("metrics") as stage:
+        metrics = ranking_metrics(top_indices, truth, ks=ks) if len(eval_user_rows) else {}
+        stage["rows"] = len(eval_user_rows)
+
+    return {
+        "cutoff": cutoff.isoformat(),
+        "exclude_seen": exclude_seen,
+        "train": {"interactions": int(interactions.nnz), "users": len(id_index.user_ids), "brands": n_brands},
+        "test": {"users": len(eval_user_rows), "pairs": int(truth.nnz)},
+        "metrics": {f"@{k}": values for k, values in metrics.items()},
+        "performance": {
+            "train_seconds": train_stage["seconds"],
+            "train_cpu_seconds": train_stage["cpu_seconds"],
+            "score_seconds": score_stage["seconds"],
+            "score_users_per_sec": round(len(eval_user_rows) / score_stage["seconds"], 1) if score_stage["seconds"] else None,
+            "score_workers": workers,
+            "peak_rss_mb": max(s["peak_rss_mb"] for s in run.stages),
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="시간 기준 분할 오프라인 평가")
+    parser.add_argument("--cutoff", help="학습/평가 기준 시각 (ISO 형식, 없으면 최근 기록 - test-days)")
+    parser.add_argument("--test-days", type=float, default=7, help="평가 기간 (일)")
+    parser.add_argument("--k", default="5,10", help="평가 k 목록 (쉼표 구분)")
+    parser.add_argument("--workers", default=str(SCORING_PROCESSES), help="점수 계산 프로세스 수 (정수 또는 auto)")
+    parser.add_argument("--epochs", type=int, help="고정 epoch 학습 (없으면 배치와 같은 조기 종료 설정)")
+    parser.add_argument("--exclude-seen", action="store_true", help="학습에 쓴 (사용자, 브랜드) 도 추천 후보에서 제외")
+    parser.add_argument("--report-dir", default=OFFLINE_EVAL_REPORT_DIR)
+    args = parser.parse_args()
+
+    run = PipelineRun()
+    try:
+        result = run_offline_evaluation(
+            get_engine(), cutoff=_parse_cutoff(args.cutoff), test_days=args.test_days,
+            ks=[int(k) for k in args.k.split(",") if k.strip()], workers=resolve_num_threads(args.workers),
+            epochs=args.epochs, exclude_seen=args.exclude_seen, run=run,
+        )
+    except BaseException as e:
+        run.write_report(args.report_dir, "FAILED", error=str(e))
+        raise
+
+    print(f"\n📊 오프라인 평가 (평가 사용자 {result['test']['users']}명, 정답 {result['test']['pairs']}건)")
+    for k, values in result["metrics"].items():
+        print(f"{k}: " + ", ".join(f"{name}={value:.4f}" for name, value in values.items()))
+    performance = result["performance"]
+    print(f"⏱️ 학습 {performance['train_seconds']}s, 점수 계산 {performance['score_seconds']}s "
+          f"({performance['score_users_per_sec']} users/s, workers={performance['score_workers']}), "
+          f"최대 RSS {performance['peak_rss_mb']}MB")
+
+    report_path = run.write_report(args.report_dir, "SUCCEEDED", **result)
+    print(f"🧾 평가 리포트: {report_path}")
+    return result
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,39 +1,102 @@
+import io
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
 from sqlalchemy import text
+from app.config.settings import DB_TIMEZONE, BULK_COPY_MIN_ROWS, COPY_CHUNK_ROWS
 import logging
 logger = logging.getLogger(__name__)
 
-def save_to_db(engine, recommend_df):
+'''
+추천/통계 결과 DB 저장
+대량 데이터는 COPY FROM STDIN 으로 스트리밍하고, 소량은 execute_values 로 한 번에 INSERT
+'''
+
+RECOMMENDATION_COLUMNS = ["user_id", "brand_id", "score", "rank", "created_at", "updated_at"]
+STATISTICS_COLUMNS = [
+    "user_id", "my_map_list_id", "store_id",
+    "brand_id", "brand_name", "category_id", "category_name",
+    "statistics_type", "created_at", "updated_at",
+]
+
+def _db_timezone():
+    return DB_TIMEZONE or datetime.now().astimezone().tzinfo
+
+def _copy_ready(df):
+    # merge 로 float 이 된 정수 컬럼(예: category_id 3.0)은 정수 컬럼 COPY 가 실패하므로 Int64 로 복원
+    # 시간대가 있는 시각(UTC)은 DB_TIMEZONE 기준 시간대 없는 시각으로 변환:
+    # COPY 텍스트는 timestamp 컬럼에서 offset 이 버려지므로, COPY/INSERT 어느 경로든 같은 값이 저장되도록 미리 맞춤
+    df = df.copy()
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.DatetimeTZDtype):
+            df[column] = df[column].dt.tz_convert(_db_timezone()).dt.tz_localize(None)
+        elif pd.api.types.is_float_dtype(df[column]):
+            values = df[column].dropna()
+            if len(values) and (values == np.floor(values)).all():
+                df[column] = df[column].astype("Int64")
+    return df
+
+def _copy_frame(cursor, table, df, columns):
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    for start in range(0, len(df), COPY_CHUNK_ROWS):
+        buffer = io.StringIO()
+        # CSV 에서 빈 값(따옴표 없음)은 NULL 로 적재
+        df.iloc[start:start + COPY_CHUNK_ROWS].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+
+def _insert_values(cursor, table, df, columns):
+    rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    execute_values(cursor, f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s", list(rows), page_size=1000)
+
+def bulk_insert(conn, table, df, columns):
+    if df.empty:
+        return 0
+
+    df = _copy_ready(df[columns])
+    cursor = conn.connection.cursor()
+    try:
+        if len(df) >= BULK_COPY_MIN_ROWS:
+            _copy_frame(cursor, table, df, columns)
+        else:
+            _insert_values(cursor, table, df, columns)
+    finally:
+        cursor.close()
+    return len(df)
+
+def replace_user_recommendations(engine, user_id, recommend_df):
+    # 온디맨드 재추천: 해당 사용자의 기존 추천을 교체해 테이블이 계속 커지지 않도록 함
     with engine.begin() as conn:
-        conn.execute(
-            text("""
-                INSERT INTO recommendation (user_id, brand_id, score, rank, created_at, updated_at)
-                VALUES (:user_id, :brand_id, :score, :rank, :created_at, :updated_at)
-            """),
-            recommend_df[["user_id", "brand_id", "score", "rank", "created_at", "updated_at"]].to_dict("records")
-        )
-
-def save_statistics(engine, statistics_df):
+        conn.execute(text("DELETE FROM recommendation WHERE user_id = :user_id"), {"user_id": user_id})
+        bulk_insert(conn, "recommendation", recommend_df, RECOMMENDATION_COLUMNS)
+
+def replace_recommendation_statistics(engine, statistics_df, user_id=None, user_ids=None):
+    # statistics 는 다른 유형의 통계와 함께 쓰는 테이블이므로 RECOMMENDATION 유형만 교체
     if statistics_df.empty:
         logger.warning("⚠️ 저장할 통계 데이터가 없습니다.")
         return
-    
-    statistics_records = statistics_df.to_dict('records')
 
+    query = "DELETE FROM statistics WHERE statistics_type = 'RECOMMENDATION'"
+    params = {}
+    if user_id is not None:
+        query += " AND user_id = :user_id"
+        params["user_id"] = user_id
+    if user_ids is not None:
+        query += " AND user_id = ANY(:user_ids)"
+        params["user_ids"] = [int(uid) for uid in user_ids]
+
+    with engine.begin() as conn:
+        conn.execute(text(query), params)
+        saved = bulk_insert(conn, "statistics", statistics_df, STATISTICS_COLUMNS)
+
+    logger.info(f"📊 통계 {saved}건 교체 완료")
+
+def delete_stale_recommendation_statistics(engine, before):
+    # shard 단위 저장 후, 이번 배치에서 다시 쓰이지 않은(이전 배치) RECOMMENDATION 통계 정리
     with engine.begin() as conn:
-        conn.execute(
-            text("""
-                INSERT INTO statistics (
-                    user_id, my_map_list_id, store_id,
-                    brand_id, brand_name, category_id, category_name,
-                    statistics_type, created_at, updated_at
-                )
-                VALUES (
-                    :user_id, :my_map_list_id, :store_id,
-                    :brand_id, :brand_name, :category_id, :category_name,
-                    :statistics_type, :created_at, :updated_at
-                )
-            """),
-            statistics_records
-        )
-
-    logger.info(f"📊 통계 {len(statistics_records)}건 저장 완료")
\ No newline at end of file
+        deleted = conn.execute(
+            text("DELETE FROM statistics WHERE statistics_type = 'RECOMMENDATION' AND created_at < :before"),
+            {"before": before}
+        ).rowcount
+    logger.info(f"🧹 이전 추천 통계 {deleted}건 삭제")
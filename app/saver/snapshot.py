@@ -0,0 +1,165 @@
+import re
+import logging
+from datetime import datetime
+from sqlalchemy import text
+from app.config.settings import KEEP_RECOMMENDATION_RUNS, RECOMMENDATION_SWAP_LOCK_TIMEOUT
+from app.saver.db_saver import bulk_insert, RECOMMENDATION_COLUMNS
+
+'''
+배치 추천 결과 스냅샷 교체
+
+배치 결과를 run_id 별 스테이징 테이블(recommendation_<run_id>)에 COPY 로 적재한 뒤,
+한 트랜잭션 안에서 테이블 이름을 바꿔(recommendation -> recommendation_<이전 run_id>, 스테이징 -> recommendation)
+새 결과를 원자적으로 공개한다. 직전 KEEP_RECOMMENDATION_RUNS 개 실행분은 롤백용으로 남기고 나머지는 삭제한다.
+실행 이력은 recommendation_runs 테이블에 기록한다.
+'''
+
+logger = logging.getLogger(__name__)
+
+LIVE_TABLE = "recommendation"
+RUNS_TABLE = "recommendation_runs"
+
+STATUS_STAGED = "STAGED"
+STATUS_LIVE = "LIVE"
+STATUS_ARCHIVED = "ARCHIVED"
+
+# 스냅샷 교체 이전부터 있던 테이블을 보관할 때 쓰는 run_id 접두어
+LEGACY_RUN_PREFIX = "before_"
+
+def new_run_id():
+    return datetime.now().strftime("%Y%m%d%H%M%S")
+
+def _table_name(run_id):
+    # 테이블 이름에 그대로 들어가므로 식별자로 안전한 값만 허용
+    if not re.fullmatch(r"\w+", run_id):
+        raise ValueError(f"잘못된 run_id: {run_id}")
+    return f"{LIVE_TABLE}_{run_id}"
+
+def _ensure_runs_table(conn):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {RUNS_TABLE} (
+            run_id VARCHAR(64) PRIMARY KEY,
+            table_name VARCHAR(128) NOT NULL,
+            status VARCHAR(16) NOT NULL,
+            row_count BIGINT,
+            created_at TIMESTAMP NOT NULL DEFAULT now(),
+            published_at TIMESTAMP
+        )
+    """))
+
+def begin_staging(engine, run_id):
+    # 기본값/제약조건/인덱스까지 현재 테이블과 동일한 구조의 빈 스테이징 테이블 생성
+    table = _table_name(run_id)
+    with engine.begin() as conn:
+        _ensure_runs_table(conn)
+        conn.execute(text(f"CREATE TABLE {table} (LIKE {LIVE_TABLE} INCLUDING ALL)"))
+        conn.execute(
+            text(f"INSERT INTO {RUNS_TABLE} (run_id, table_name, status) VALUES (:run_id, :table_name, :status)"),
+            {"run_id": run_id, "table_name": table, "status": STATUS_STAGED}
+        )
+    return table
+
+def append_staged_recommendations(engine, run_id, recommend_df):
+    with engine.begin() as conn:
+        return bulk_insert(conn, _table_name(run_id), recommend_df, RECOMMENDATION_COLUMNS)
+
+def complete_staging(engine, run_id, row_count):
+    table = _table_name(run_id)
+    with engine.begin() as conn:
+        conn.execute(text(f"ANALYZE {table}"))
+        conn.execute(
+            text(f"UPDATE {RUNS_TABLE} SET row_count = :row_count WHERE run_id = :run_id"),
+            {"row_count": row_count, "run_id": run_id}
+        )
+    logger.info(f"📥 스테이징 테이블 {table} 적재 완료 ({row_count}건)")
+    return table
+
+def stage_recommendations(engine, recommend_df, run_id):
+    # 중간에 실패해 남은 스테이징 테이블은 다음 공개 시 정리됨 (_cleanup_runs)
+    begin_staging(engine, run_id)
+    row_count = append_staged_recommendations(engine, run_id, recommend_df)
+    return complete_staging(engine, run_id, row_count)
+
+def _drop_run_table(conn, table):
+    # serial 컬럼은 LIKE 로 만든 테이블들이 같은 시퀀스를 공유하므로,
+    # 삭제할 테이블이 시퀀스 소유자라면 현재 테이블로 소유권을 넘긴 뒤 삭제
+    shared_sequences = conn.execute(text("""
+        SELECT d.objid::regclass::text AS sequence_name, a.attname
+        FROM pg_depend d
+        JOIN pg_class c ON c.oid = d.objid AND c.relkind = 'S'
+        JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+        WHERE d.refobjid = CAST(:table AS regclass)
+          AND d.deptype = 'a'
+          AND EXISTS (
+              SELECT 1 FROM pg_depend dd
+              JOIN pg_attrdef ad ON ad.oid = dd.objid
+              WHERE dd.refobjid = d.objid AND ad.adrelid = CAST(:live_table AS regclass) AND ad.adnum = a.attnum
+          )
+    """), {"table": table, "live_table": LIVE_TABLE}).fetchall()
+
+    for sequence_name, column in shared_sequences:
+        conn.execute(text(f"ALTER SEQUENCE {sequence_name} OWNED BY {LIVE_TABLE}.{column}"))
+
+    conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+
+def _cleanup_runs(conn, keep_runs):
+    # 공개되지 못한 이전 스테이징 테이블과 보관 개수를 넘는 과거 실행분 삭제
+    stale = conn.execute(text(f"""
+        SELECT run_id, table_name FROM {RUNS_TABLE}
+        WHERE status = :staged
+        UNION ALL
+        SELECT run_id, table_name FROM (
+            SELECT run_id, table_name FROM {RUNS_TABLE}
+            WHERE status = :archived
+            -- 이전 테이블 보관분은 첫 교체 시각이 찍혀 있으므로 실제 실행보다 먼저 밀려나도록 가장 오래된 것으로 취급
+            ORDER BY run_id LIKE :legacy_pattern, created_at DESC, run_id DESC
+            OFFSET :keep_runs
+        ) archived
+    """), {"staged": STATUS_STAGED, "archived": STATUS_ARCHIVED, "keep_runs": keep_runs,
+           "legacy_pattern": f"{LEGACY_RUN_PREFIX}%"}).fetchall()
+
+    for run_id, table in stale:
+        _drop_run_table(conn, table)
+        conn.execute(text(f"DELETE FROM {RUNS_TABLE} WHERE run_id = :run_id"), {"run_id": run_id})
+        logger.info(f"🧹 이전 추천 테이블 삭제: {table}")
+
+def publish_recommendations(engine, run_id, keep_runs=KEEP_RECOMMENDATION_RUNS):
+    staged_table = _table_name(run_id)
+    with engine.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{RECOMMENDATION_SWAP_LOCK_TIMEOUT}'"))
+        conn.execute(text(f"LOCK TABLE {LIVE_TABLE} IN ACCESS EXCLUSIVE MODE"))
+
+        live_run_id = conn.execute(
+            text(f"SELECT run_id FROM {RUNS_TABLE} WHERE status = :live"), {"live": STATUS_LIVE}
+        ).scalar()
+        # 스냅샷 교체 이전부터 쌓여 있던 테이블도 한 번은 보관
+        archived_run_id = live_run_id or f"{LEGACY_RUN_PREFIX}{run_id}"
+        archived_table = _table_name(archived_run_id)
+
+        conn.execute(text(f"ALTER TABLE {LIVE_TABLE} RENAME TO {archived_table}"))
+        conn.execute(text(f"ALTER TABLE {staged_table} RENAME TO {LIVE_TABLE}"))
+
+        if live_run_id:
+            conn.execute(
+                text(f"UPDATE {RUNS_TABLE} SET status = :archived, table_name = :table_name WHERE run_id = :run_id"),
+                {"archived": STATUS_ARCHIVED, "table_name": archived_table, "run_id": live_run_id}
+            )
+        else:
+            conn.execute(
+                text(f"INSERT INTO {RUNS_TABLE} (run_id, table_name, status, published_at) VALUES (:run_id, :table_name, :archived, now())"),
+                {"run_id": archived_run_id, "table_name": archived_table, "archived": STATUS_ARCHIVED}
+            )
+        conn.execute(
+            text(f"UPDATE {RUNS_TABLE} SET status = :live, table_name = :table_name, published_at = now() WHERE run_id = :run_id"),
+            {"live": STATUS_LIVE, "table_name": LIVE_TABLE, "run_id": run_id}
+        )
+
+        _cleanup_runs(conn, keep_runs)
+
+    logger.info(f"🔁 추천 결과 교체 완료 (run_id={run_id})")
+
+def save_recommendation_snapshot(engine, recommend_df, run_id=None, keep_runs=KEEP_RECOMMENDATION_RUNS):
+    run_id = run_id or new_run_id()
+    stage_recommendations(engine, recommend_df, run_id)
+    publish_recommendations(engine, run_id, keep_runs)
+    return run_id
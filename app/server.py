@@ -1,15 +1,37 @@
 import os
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from dotenv import load_dotenv
 from app.api.endpoint import router as api_router
+from app.api.metrics import router as metrics_router, metrics_middleware
+from app.api.warmup import router as warmup_router, warm_up
+from app.config.database import configure_api_pools, dispose_engine, dispose_async_engine
 
 load_dotenv()  # .env 파일 로드
 debug_mode = os.getenv("DEBUG", "false").lower() == "true"
 
+logger = logging.getLogger(__name__)
+
+# 비동기(조회) 풀과 동기(저장) 풀이 프로세스당 커넥션 예산을 나눠 쓰도록 엔진 생성 전에 설정
+configure_api_pools()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 모델/브랜드 카탈로그/커넥션 풀을 미리 준비하고 더미 추천을 한 번 계산한 뒤 ready (/status/ready)
+    await warm_up()
+    yield
+    dispose_engine()
+    await dispose_async_engine()
+
 app = FastAPI(
     title="U-Hyu Recommendation API",
     version="1.0.0",
-    debug=debug_mode
+    debug=debug_mode,
+    lifespan=lifespan
 )
 
-app.include_router(api_router)
\ No newline at end of file
+app.middleware("http")(metrics_middleware)
+app.include_router(api_router)
+app.include_router(metrics_router)
+app.include_router(warmup_router)
@@ -1,4 +1,16 @@
-from collections import defaultdict
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+'''
+추천 결과 평가
+
+사용자별 반복/출력 없이 (사용자, 브랜드), (사용자, 카테고리) 쌍 배열에 대한 집합 연산으로
+precision/recall/hit@k 와 카테고리 매치율(추천/정답 카테고리 집합의 Jaccard)을 계산하고 지표 dict 로 반환한다.
+예시 사용자는 카테고리 벡터의 평균 코사인 유사도가 높은 사용자로 고르되,
+사용자 x 사용자 유사도 행렬 대신 정규화 벡터와 전체 합 벡터의 내적(사용자 수에 선형)으로 계산한다.
+ranking_metrics 는 top-k 아이템 행렬과 정답 sparse 행렬로 precision/recall/hit/NDCG/MAP/coverage@k 를 계산한다. (오프라인 평가용)
+'''
 
 def evaluate_metrics(recommended, ground_truth, k=5):
     recommended = recommended[:k]
@@ -8,108 +20,128 @@ def evaluate_metrics(recommended, ground_truth, k=5):
     hit = int(hits > 0)
     return {"precision": precision, "recall": recall, "hit": hit}
 
-def evaluate_recommendations(recommend_df, user_brand_df, brand_df, top_k=5):
-    print("\n🧪 추천 결과 평가 중...\n")
-
-    data_type = "INTEREST"
-    df = user_brand_df
-
-    # 각 브랜드의 brand_id를 키, category_id를 값으로 하는 딕셔너리를 생성
-    brand_category_map = dict(zip(brand_df['brand_id'], brand_df['category_id']))
-
-    # 1. 정답 브랜드 맵
-    ground_truth_map = defaultdict(set)
-    for row in df.itertuples():
-        ground_truth_map[row.user_id].add(row.brand_id)
-
-    # 2. 추천 브랜드 맵
-    recommendation_map = defaultdict(list)
-    for row in recommend_df.itertuples():
-        recommendation_map[row.user_id].append(row.brand_id)
-
-    # 3. 사용자별 Precision/Recall/Hit 계산 및 카테고리 매치율 계산
-    scores = defaultdict(list)
-    category_match_rates = []
-
-    for user_id in recommend_df['user_id'].unique():
-        recommended = recommendation_map.get(user_id, [])[:top_k]
-        ground_truth = ground_truth_map.get(user_id, set())
-
-        print(f"user_id: {user_id}")
-        print(f"👉 추천 알고리즘이 해당 유저에게 추천한 Top-K 브랜드 리스트 : {recommended}")
-        print(f"👉 해당 유저가 실제로 관심 있었다고 판단된 브랜드들: {list(ground_truth)}")
-
-        # 카테고리 매치율 계산
-        recommended_categories = set(brand_category_map.get(bid) for bid in recommended if bid in brand_category_map)
-        ground_truth_categories = set(brand_category_map.get(bid) for bid in ground_truth if bid in brand_category_map)
-
-        print(f"recommended categories: {list(recommended_categories)}")
-        print(f"ground truth categories: {list(ground_truth_categories)}")
-        print(f"✅ 추천 브랜드 목록: {[f'{bid} (cat:{brand_category_map.get(bid)})' for bid in recommended]}")
-        print(f"✅ 관심 브랜드 목록: {[f'{bid} (cat:{brand_category_map.get(bid)})' for bid in ground_truth]}")
-
-        metrics = evaluate_metrics(recommended, ground_truth, k=top_k)
-        for k_metric, v in metrics.items():
-            scores[k_metric].append(v)
-
-        if recommended_categories or ground_truth_categories:
-            intersection = recommended_categories & ground_truth_categories
-            union = recommended_categories | ground_truth_categories
-            category_match_rate = len(intersection) / len(union)
-        else:
-            category_match_rate = 0
-
-        category_match_rates.append(category_match_rate)
-
-    # 4. 평균 계산 및 출력
-    avg_metrics = {k_metric: sum(v) / len(v) if v else 0 for k_metric, v in scores.items()}
-    avg_category_match_rate = sum(category_match_rates) / len(category_match_rates) if category_match_rates else 0
-
-    print(f"\n📊 INTEREST 추천 평가 지표 : ")
-    for k_metric, v in avg_metrics.items():
-        print(f"{k_metric}@{top_k}: {v:.4f}")
-    print(f"category_match_rate@{top_k}: {avg_category_match_rate:.4f}")
-    print()
-
-    # 📌 관심 브랜드 및 카테고리 유사도 기반 예시 사용자 추천 결과 확인
-    from sklearn.metrics.pairwise import cosine_similarity
-    import pandas as pd
-
-    print("\n📌 관심 브랜드-추천 결과 카테고리 유사도 기반 예시 사용자 추천 결과 확인 (2~3명):")
-
-    category_vectors = []
-
-    for user_id in recommend_df['user_id'].unique():
-        recommended = recommendation_map.get(user_id, [])[:top_k]
-        ground_truth = ground_truth_map.get(user_id, set())
-
-        recommended_categories = set(brand_category_map.get(bid) for bid in recommended if bid in brand_category_map)
-        ground_truth_categories = set(brand_category_map.get(bid) for bid in ground_truth if bid in brand_category_map)
-
-        all_cats = set(brand_category_map.values())
-        vec = []
-        for cat in all_cats:
-            vec.append(int(cat in recommended_categories))
-            vec.append(int(cat in ground_truth_categories))
-        category_vectors.append((user_id, vec))
-
-    df_vec = pd.DataFrame([v[1] for v in category_vectors], index=[v[0] for v in category_vectors])
-    similarities = cosine_similarity(df_vec)
-    avg_sims = similarities.mean(axis=1)
-    top_indices = avg_sims.argsort()[::-1][:3]
-    top_users = df_vec.index[top_indices]
-
-    for user_id in top_users:
-        rec_brands = recommend_df[recommend_df['user_id'] == user_id]['brand_id'].tolist()
-        true_brands = user_brand_df[
-            (user_brand_df['user_id'] == user_id) &
-            (user_brand_df['data_type'].str.upper() == "INTEREST")
-        ]['brand_id'].tolist()
-        rec_brands_with_cat = [(bid, brand_category_map.get(bid)) for bid in rec_brands]
-        print(f"유저 {user_id} 추천 (브랜드, 카테고리) : {rec_brands_with_cat}")
-        print(f"유저 {user_id} 관심 브랜드: {true_brands}\n")
-
-    # 📊 사용자별 INTEREST 브랜드 개수 통계
-    print("\n📊 사용자별 INTEREST 브랜드 개수 통계:")
-    interest_counts = user_brand_df[user_brand_df["data_type"].str.upper() == "INTEREST"].groupby("user_id")['brand_id'].count()
-    print(interest_counts.describe())
\ No newline at end of file
+def ranking_metrics(top_indices, truth, ks=(5,), n_items=None):
+    # top_indices: (사용자 x k) 점수 내림차순 아이템 열 번호, truth: 같은 사용자 순서의 (사용자 x 아이템) 정답 sparse 행렬
+    # 정답이 없는 사용자는 호출 전에 제외 (recall/NDCG/MAP 분모가 0)
+    truth = sp.csr_matrix(truth)
+    n_users, max_k = top_indices.shape
+    n_items = n_items or truth.shape[1]
+    n_truth = np.diff(truth.indptr)
+
+    rows = np.repeat(np.arange(n_users), max_k)
+    relevant = np.asarray(truth[rows, top_indices.ravel()]).reshape(n_users, max_k) > 0
+    discounts = 1.0 / np.log2(np.arange(2, max_k + 2))
+    ideal_dcg = np.concatenate([[0.0], np.cumsum(discounts)])
+
+    results = {}
+    for k in ks:
+        rel = relevant[:, :k]
+        k_eff = rel.shape[1]
+        hits = rel.sum(axis=1)
+        n_ideal = np.minimum(n_truth, k_eff)
+        dcg = rel @ discounts[:k_eff]
+        # AP@k: 적중 위치마다의 precision 평균 (분모는 min(정답 수, k))
+        precision_at = np.cumsum(rel, axis=1) / np.arange(1, k_eff + 1)
+        average_precision = (precision_at * rel).sum(axis=1) / np.maximum(n_ideal, 1)
+        results[k] = {
+            "precision": float((hits / k).mean()),
+            "recall": float((hits / np.maximum(n_truth, 1)).mean()),
+            "hit_rate": float((hits > 0).mean()),
+            "ndcg": float((dcg / np.maximum(ideal_dcg[n_ideal], 1e-12)).mean()),
+            "map": float(average_precision.mean()),
+            "coverage": len(np.unique(top_indices[:, :k])) / n_items if n_items else 0.0,
+        }
+    return results
+
+def _pair_keys(user_codes, values, n_values):
+    # (사용자 코드, 값 코드) 쌍을 정수 하나로 만들어 중복 제거 (집합 의미)
+    return np.unique(user_codes.astype(np.int64) * n_values + values)
+
+def _intersection_counts(left_keys, right_keys, n_values, n_users):
+    common = left_keys[np.isin(left_keys, right_keys, assume_unique=True)]
+    return np.bincount(common // n_values, minlength=n_users)
+
+def _scalar(value):
+    return value.item() if hasattr(value, "item") else value
+
+def _mean_cosine_similarity(keys, n_values, n_users):
+    # 사용자별 (모든 사용자와의 코사인 유사도) 평균 = 정규화 벡터 . (정규화 벡터 합) / 사용자 수
+    vectors = sp.csr_matrix((np.ones(len(keys)), (keys // n_values, keys % n_values)), shape=(n_users, n_values))
+    norms = np.sqrt(np.diff(vectors.indptr))
+    vectors.data /= np.repeat(norms, np.diff(vectors.indptr))
+    total = np.asarray(vectors.sum(axis=0)).ravel()
+    return vectors @ total / n_users
+
+def evaluate_recommendations(recommend_df, user_brand_df, brand_df, top_k=5, n_samples=3):
+    # 정답: 사용자별 user_brand 브랜드 전체, 평가 대상: 추천 결과가 있는 사용자
+    users = pd.unique(recommend_df["user_id"])
+    n_users = len(users)
+    if n_users == 0:
+        return {"k": top_k, "users": 0}
+
+    user_index = pd.Index(users)
+    # 사용자별 추천 순서대로 상위 top_k 개
+    recommended = recommend_df[recommend_df.groupby("user_id", sort=False).cumcount() < top_k]
+    rec_users = user_index.get_indexer(recommended["user_id"])
+    gt_users = user_index.get_indexer(user_brand_df["user_id"])
+    gt_known = gt_users >= 0
+
+    brand_codes, brand_values = pd.factorize(pd.concat([recommended["brand_id"], user_brand_df["brand_id"]], ignore_index=True))
+    n_brands = max(len(brand_values), 1)
+    rec_brand_keys = _pair_keys(rec_users, brand_codes[:len(recommended)], n_brands)
+    gt_brand_keys = _pair_keys(gt_users[gt_known], brand_codes[len(recommended):][gt_known], n_brands)
+
+    hits = _intersection_counts(rec_brand_keys, gt_brand_keys, n_brands, n_users)
+    gt_counts = np.bincount(gt_brand_keys // n_brands, minlength=n_users)
+    precision = hits / top_k
+    recall = np.divide(hits, gt_counts, out=np.zeros(n_users), where=gt_counts > 0)
+
+    # 카테고리 매치율: 카테고리 정보가 있는 브랜드만 사용
+    brand_category = brand_df.drop_duplicates("brand_id", keep="last").set_index("brand_id")["category_id"]
+    category_codes, categories = pd.factorize(brand_category)
+    n_categories = max(len(categories), 1)
+    category_of = pd.Series(category_codes, index=brand_category.index)
+
+    def category_keys(user_codes, brand_ids):
+        codes = category_of.reindex(brand_ids).to_numpy()
+        valid = ~np.isnan(codes) & (codes >= 0)
+        return _pair_keys(user_codes[valid], codes[valid].astype(np.int64), n_categories)
+
+    rec_category_keys = category_keys(rec_users, recommended["brand_id"].to_numpy())
+    gt_category_keys = category_keys(gt_users[gt_known], user_brand_df["brand_id"].to_numpy()[gt_known])
+    common = _intersection_counts(rec_category_keys, gt_category_keys, n_categories, n_users)
+    union = (np.bincount(rec_category_keys // n_categories, minlength=n_users)
+             + np.bincount(gt_category_keys // n_categories, minlength=n_users) - common)
+    category_match = np.divide(common, union, out=np.zeros(n_users), where=union > 0)
+
+    # 예시 사용자: 카테고리 벡터 = [카테고리별 추천 포함 여부, 카테고리별 관심 포함 여부]
+    vector_keys = np.concatenate([
+        (rec_category_keys // n_categories) * (2 * n_categories) + (rec_category_keys % n_categories) * 2,
+        (gt_category_keys // n_categories) * (2 * n_categories) + (gt_category_keys % n_categories) * 2 + 1,
+    ])
+    mean_similarity = _mean_cosine_similarity(vector_keys, 2 * n_categories, n_users)
+    sample_codes = np.argsort(-mean_similarity, kind="stable")[:n_samples]
+
+    interest_df = user_brand_df[user_brand_df["data_type"].str.upper() == "INTEREST"]
+    interest_counts = interest_df.groupby("user_id")["brand_id"].count()
+    samples = []
+    for code in sample_codes:
+        user_id = users[code]
+        rec_brands = recommend_df.loc[recommend_df["user_id"] == user_id, "brand_id"].tolist()
+        samples.append({
+            "user_id": _scalar(user_id),
+            "mean_category_similarity": round(float(mean_similarity[code]), 4),
+            "recommended": [[bid, _scalar(brand_category.get(bid))] for bid in rec_brands],
+            "interest_brands": interest_df.loc[interest_df["user_id"] == user_id, "brand_id"].tolist(),
+        })
+
+    return {
+        "k": top_k,
+        "users": n_users,
+        "precision": float(precision.mean()),
+        "recall": float(recall.mean()),
+        "hit": float((hits > 0).mean()),
+        "category_match_rate": float(category_match.mean()),
+        "interest_count": {name: float(value) for name, value in interest_counts.describe().items()},
+        "sample_users": samples,
+    }
@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import logging
+import resource
+from contextlib import contextmanager
+from datetime import datetime
+
+'''
+배치 파이프라인 단계 계측
+main() 의 각 단계를 stage() 로 감싸 단계별 wall time, CPU time, RSS/최대 RSS, 행 수를 기록한다.
+단계가 끝날 때마다 JSON 한 줄로 로그를 남기고 listener 에 알리며, 실행이 끝나면 전체 내역을 JSON 리포트로 저장한다.
+
+    with run.stage("load_users") as stage:
+        user_df = load_user_data(conn)
+        stage["rows"] = len(user_df)
+'''
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def _current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 1024 ** 2
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _peak_rss_mb():
+    # ru_maxrss: 프로세스 시작 이후 최대 RSS (Linux 는 KB 단위)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _round(value, digits=3):
+    return round(value, digits) if value is not None else None
+
+class PipelineRun:
+    def __init__(self, listeners=None):
+        self.stages = []
+        self.listeners = list(listeners or [])
+        self.started_at = datetime.now()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    def _notify(self, event, record):
+        for listener in self.listeners:
+            listener(event, record, self)
+
+    @contextmanager
+    def stage(self, name):
+        record = {"name": name, "status": "RUNNING", "started_at": datetime.now().isoformat(timespec="seconds")}
+        self.stages.append(record)
+        self._notify("start", record)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        peak_start = _peak_rss_mb()
+        try:
+            yield record
+        except BaseException:
+            record["status"] = "FAILED"
+            raise
+        else:
+            record["status"] = "DONE"
+        finally:
+            peak_end = _peak_rss_mb()
+            record.update({
+                "seconds": _round(time.perf_counter() - wall_start),
+                # 학습/점수 계산 스레드를 포함한 프로세스 전체 CPU 시간 (seconds 보다 크면 병렬로 실행된 것)
+                "cpu_seconds": _round(time.process_time() - cpu_start),
+                "rss_mb": _round(_current_rss_mb(), 1),
+                "peak_rss_mb": _round(peak_end, 1),
+                "peak_rss_growth_mb": _round(peak_end - peak_start, 1),
+            })
+            logger.info(json.dumps({"event": "pipeline_stage", **record}, ensure_ascii=False, default=str))
+            self._notify("end", record)
+
+    def report(self, status, **extra):
+        return {
+            "status": status,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "seconds": _round(time.perf_counter() - self._wall_start),
+            "cpu_seconds": _round(time.process_time() - self._cpu_start),
+            "peak_rss_mb": _round(_peak_rss_mb(), 1),
+            "stages": self.stages,
+            **extra,
+        }
+
+    def write_report(self, report_dir, status, **extra):
+        # <report_dir>/<시작 시각>.json 과 latest.json 으로 저장
+        report = self.report(status, **extra)
+        os.makedirs(report_dir, exist_ok=True)
+        path = os.path.join(report_dir, f"{self.started_at.strftime('%Y%m%d%H%M%S')}.json")
+        for target in [path, os.path.join(report_dir, "latest.json")]:
+            tmp_path = f"{target}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+            os.replace(tmp_path, target)
+        logger.info(json.dumps({"event": "pipeline_report", "path": path, "status": status,
+                                "seconds": report["seconds"], "peak_rss_mb": report["peak_rss_mb"]}, ensure_ascii=False))
+        return path
@@ -0,0 +1,82 @@
+import argparse
+import json
+import subprocess
+import sys
+
+'''
+API 서버 import 시간 벤치마크
+새 인터프리터에서 모듈(기본 app.server)을 import 하는 시간을 반복 측정하고,
+-X importtime 결과에서 누적 시간이 큰 모듈과 서빙 프로세스에 올라오면 안 되는 배치 전용 모듈 목록을 보여준다.
+
+    python -m benchmarks.import_time --module app.server --repeat 5
+'''
+
+# 서빙 경로에서는 import 되지 않아야 하는 배치/학습 전용 모듈
+BATCH_ONLY_MODULES = ["app.main", "app.model.trainer", "app.utils.evaluator", "app.user_recommendation",
+                      "lightfm.data", "sklearn", "matplotlib"]
+
+_MEASURE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start, "modules": sorted(sys.modules)}}))
+"""
+
+def _measure(module):
+    output = subprocess.run([sys.executable, "-c", _MEASURE.format(module=module)],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def _slowest_imports(module, top):
+    # -X importtime 은 stderr 에 "self | cumulative | 모듈" 형식으로 출력 (마이크로초)
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            check=True, capture_output=True, text=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [part.strip() for part in line[len("import time:"):].split("|")]
+        if parts[0].isdigit():
+            rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return [{"module": name, "self_ms": round(own / 1000, 1), "cumulative_ms": round(cumulative / 1000, 1)}
+            for name, own, cumulative in rows[:top]]
+
+def run(module, repeat, top):
+    runs = [_measure(module) for _ in range(repeat)]
+    seconds = sorted(r["seconds"] for r in runs)
+    loaded = set(runs[-1]["modules"])
+    batch_modules = [name for name in BATCH_ONLY_MODULES if name in loaded]
+
+    result = {
+        "module": module,
+        "min_seconds": round(seconds[0], 4),
+        "median_seconds": round(seconds[len(seconds) // 2], 4),
+        "modules_loaded": len(loaded),
+        "batch_only_modules_loaded": batch_modules,
+        "slowest_imports": _slowest_imports(module, top),
+    }
+
+    print(f"import {module}: min {result['min_seconds']:.3f}s median {result['median_seconds']:.3f}s "
+          f"({result['modules_loaded']} modules)")
+    print(f"배치 전용 모듈: {batch_modules or '없음'}")
+    for row in result["slowest_imports"]:
+        print(f"  {row['cumulative_ms']:>9.1f}ms (self {row['self_ms']:>7.1f}ms) {row['module']}")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="API 서버 import 시간 벤치마크")
+    parser.add_argument("--module", default="app.server")
+    parser.add_argument("--repeat", type=int, default=5, help="측정 반복 횟수 (새 프로세스)")
+    parser.add_argument("--top", type=int, default=15, help="누적 import 시간 상위 모듈 수")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    result = run(args.module, args.repeat, args.top)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
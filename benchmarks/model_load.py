@@ -0,0 +1,62 @@
+import argparse
+import json
+import tempfile
+import time
+from app.model.store import save_model_artifact, load_model_artifact, load_serving_artifact
+from app.model.trainer import train_model
+from benchmarks.synthetic import make_synthetic_data, build_training_inputs
+
+'''
+모델 아티팩트 로드 시간 벤치마크
+합성 데이터로 학습한 모델을 저장한 뒤 pickle 로드(ModelArtifact)와 mmap 로드(MappedModelArtifact)의
+소요 시간을 비교한다. (mmap 로드는 체크섬 검증 여부별로 측정)
+
+    python -m benchmarks.model_load --users 100000,500000 --epochs 1
+'''
+
+def _best(fn, repeat):
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed.append(time.perf_counter() - start)
+    return min(elapsed)
+
+def run(user_sizes, n_brands, epochs, repeat):
+    results = []
+    for n_users in user_sizes:
+        inputs = build_training_inputs(make_synthetic_data(n_users, n_brands=n_brands))
+        model = train_model(inputs["interactions"], inputs["weights"], inputs["user_features"], inputs["item_features"],
+                            epochs=epochs)
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            save_model_artifact(model, inputs["dataset"], inputs["item_features"], model_dir=model_dir)
+            result = {
+                "users": n_users,
+                "brands": n_brands,
+                "pickle_seconds": round(_best(lambda: load_model_artifact(model_dir), repeat), 4),
+                "mmap_seconds": round(_best(lambda: load_serving_artifact(model_dir, verify=False), repeat), 4),
+                "mmap_verified_seconds": round(_best(lambda: load_serving_artifact(model_dir, verify=True), repeat), 4),
+            }
+        results.append(result)
+        print(f"users={n_users:>9} pickle {result['pickle_seconds']:>8.4f}s mmap {result['mmap_seconds']:>8.4f}s "
+              f"mmap+checksum {result['mmap_verified_seconds']:>8.4f}s")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="모델 아티팩트 로드 시간 벤치마크")
+    parser.add_argument("--users", default="100000", help="사용자 수 목록 (쉼표 구분)")
+    parser.add_argument("--brands", type=int, default=500)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="로드 반복 횟수 (최솟값 사용)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    results = run([int(u) for u in args.users.split(",") if u.strip()], args.brands, args.epochs, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
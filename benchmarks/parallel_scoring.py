@@ -0,0 +1,89 @@
+import argparse
+import json
+import time
+import numpy as np
+from app.config.settings import resolve_num_threads
+from app.model.recommender import score_users
+from app.model.parallel import score_users_parallel
+
+'''
+배치 추천 점수 계산 병렬화 벤치마크
+합성 사용자/아이템 표현으로 직렬 계산(score_users)과 프로세스 수별 병렬 계산(score_users_parallel)의
+소요 시간과 속도 향상을 비교하고, 결과가 직렬 계산과 정확히 같은지 확인한다.
+(병렬 시간에는 워커 프로세스 시작과 공유 메모리 복사 비용이 포함됨)
+
+    python -m benchmarks.parallel_scoring --users 200000,1000000 --brands 500 --workers 1,2,4,auto
+'''
+
+def _parse_list(value):
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+def _representations(n_users, n_brands, dim, seed=42):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.standard_normal((n_users, dim), dtype=np.float32),
+        rng.standard_normal(n_users, dtype=np.float32),
+        rng.standard_normal((n_brands, dim), dtype=np.float32),
+        rng.standard_normal(n_brands, dtype=np.float32),
+    )
+
+def run(user_sizes, n_brands, dim, worker_options, top_k, repeat):
+    results = []
+    for n_users in user_sizes:
+        arrays = _representations(n_users, n_brands, dim)
+
+        serial = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            expected = score_users(*arrays, top_k=top_k)
+            serial.append(time.perf_counter() - start)
+        serial_seconds = min(serial)
+        print(f"users={n_users:>9} serial {serial_seconds:>8.3f}s")
+
+        for option in worker_options:
+            workers = resolve_num_threads(option)
+            elapsed = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                actual = score_users_parallel(*arrays, top_k=top_k, workers=workers)
+                elapsed.append(time.perf_counter() - start)
+            best = min(elapsed)
+
+            identical = np.array_equal(actual[0], expected[0]) and np.array_equal(actual[1], expected[1])
+            result = {
+                "users": n_users,
+                "brands": n_brands,
+                "dim": dim,
+                "workers": workers,
+                "workers_option": option,
+                "serial_seconds": round(serial_seconds, 4),
+                "seconds": round(best, 4),
+                "speedup": round(serial_seconds / best, 3),
+                "users_per_sec": round(n_users / best, 1),
+                "identical": identical,
+            }
+            results.append(result)
+            print(f"users={n_users:>9} workers={workers:>3} ({option}) {best:>8.3f}s "
+                  f"speedup={result['speedup']:>6.2f}x identical={identical}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="배치 추천 점수 계산 병렬화 벤치마크")
+    parser.add_argument("--users", default="100000,500000", help="사용자 수 목록 (쉼표 구분)")
+    parser.add_argument("--brands", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=10, help="임베딩 차원 (LightFM no_components)")
+    parser.add_argument("--workers", default="1,2,4,auto", help="프로세스 수 목록 (정수 또는 auto)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=1, help="조합별 반복 횟수 (최솟값 사용)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    results = run([int(u) for u in _parse_list(args.users)], args.brands, args.dim, _parse_list(args.workers),
+                  args.top_k, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+'''
+벤치마크용 로컬 DB 시딩
+로더 쿼리가 읽는 테이블만 최소 컬럼으로 만들어 합성 데이터(benchmarks/synthetic.py)를 적재한다.
+운영 테이블과 섞이지 않도록 별도 스키마(기본 bench)에 만들고, 엔진의 search_path 를 그 스키마로 지정해 사용한다.
+'''
+
+DEFAULT_SCHEMA = "bench"
+
+TABLES_DDL = """
+CREATE TABLE users (id BIGINT PRIMARY KEY, gender VARCHAR(16), age_range VARCHAR(16));
+CREATE TABLE categories (id BIGINT PRIMARY KEY, category_name VARCHAR(64));
+CREATE TABLE brands (id BIGINT PRIMARY KEY, brand_name VARCHAR(128), category_id BIGINT REFERENCES categories(id));
+CREATE TABLE store (id BIGINT PRIMARY KEY, brand_id BIGINT REFERENCES brands(id));
+CREATE TABLE recommendation_base_data (id BIGSERIAL PRIMARY KEY, user_id BIGINT, brand_id BIGINT, data_type VARCHAR(16),
+                                       created_at TIMESTAMP NOT NULL DEFAULT now());
+CREATE TABLE history (id BIGSERIAL PRIMARY KEY, user_id BIGINT, brand_id BIGINT, visited_at TIMESTAMP);
+CREATE TABLE action_logs (id BIGSERIAL PRIMARY KEY, user_id BIGINT, store_id BIGINT, action_type VARCHAR(32),
+                          created_at TIMESTAMP NOT NULL DEFAULT now());
+CREATE TABLE bookmark_list (id BIGINT PRIMARY KEY, user_id BIGINT);
+CREATE TABLE bookmark (id BIGSERIAL PRIMARY KEY, bookmark_list_id BIGINT, store_id BIGINT);
+CREATE TABLE recommendation (id BIGSERIAL PRIMARY KEY, user_id BIGINT, brand_id BIGINT, score DOUBLE PRECISION, rank INT,
+                             created_at TIMESTAMP, updated_at TIMESTAMP);
+CREATE TABLE statistics (id BIGSERIAL PRIMARY KEY, user_id BIGINT, my_map_list_id BIGINT, store_id BIGINT, brand_id BIGINT,
+                         brand_name VARCHAR(128), category_id BIGINT, category_name VARCHAR(64),
+                         statistics_type VARCHAR(32), created_at TIMESTAMP, updated_at TIMESTAMP);
+CREATE INDEX ON recommendation_base_data (user_id, data_type);
+CREATE INDEX ON history (user_id);
+CREATE INDEX ON action_logs (user_id);
+CREATE INDEX ON bookmark_list (user_id);
+CREATE INDEX ON bookmark (bookmark_list_id);
+CREATE INDEX ON recommendation (user_id);
+"""
+
+def bench_engine(url, schema=DEFAULT_SCHEMA):
+    # 모든 커넥션이 벤치마크 스키마를 먼저 보도록 search_path 지정 (psycopg2 / asyncpg 공통 옵션)
+    if "asyncpg" in url:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        return create_async_engine(url, connect_args={"server_settings": {"search_path": schema}})
+    return create_engine(url, connect_args={"options": f"-csearch_path={schema}"})
+
+def seed_database(engine, data, schema=DEFAULT_SCHEMA):
+    # 벤치마크 스키마를 새로 만들고 합성 데이터 적재 (브랜드당 매장 1개, store.id = brand_id)
+    user_brand_df = data["user_brand_df"]
+    brand_df = data["brand_df"]
+    bookmark_df = data["bookmark_df"]
+    bookmark_lists = bookmark_df["user_id"].drop_duplicates()
+
+    frames = {
+        "users": data["user_df"].rename(columns={"user_id": "id"}),
+        "categories": brand_df[["category_id", "category_name"]].drop_duplicates("category_id")
+                              .rename(columns={"category_id": "id"}),
+        "brands": brand_df[["brand_id", "brand_name", "category_id"]].rename(columns={"brand_id": "id"}),
+        "store": pd.DataFrame({"id": brand_df["brand_id"], "brand_id": brand_df["brand_id"]}),
+        "recommendation_base_data": pd.concat([
+            user_brand_df.loc[user_brand_df["data_type"] == "INTEREST", ["user_id", "brand_id", "data_type"]],
+            data["exclude_brand_df"].assign(data_type="EXCLUDE"),
+        ], ignore_index=True),
+        "history": user_brand_df.loc[user_brand_df["data_type"] == "RECENT", ["user_id", "brand_id"]]
+                                .assign(visited_at=pd.Timestamp.now().floor("s")),
+        "action_logs": data["action_logs"][["user_id", "brand_id", "action_type"]].rename(columns={"brand_id": "store_id"}),
+        "bookmark_list": pd.DataFrame({"id": bookmark_lists, "user_id": bookmark_lists}),
+        "bookmark": bookmark_df.rename(columns={"user_id": "bookmark_list_id", "brand_id": "store_id"}),
+    }
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+        conn.execute(text(f"SET LOCAL search_path TO {schema}"))
+        conn.execute(text(TABLES_DDL))
+        for table, df in frames.items():
+            df.to_sql(table, conn, schema=schema, if_exists="append", index=False, method="multi", chunksize=10000)
+        for table in frames:
+            conn.execute(text(f"ANALYZE {schema}.{table}"))
+
+    return {table: len(df) for table, df in frames.items()}
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from app.data.loader import aggregate_action_logs
+
+'''
+벤치마크용 합성 데이터 생성
+app/data/loader.py 의 로더 결과와 같은 컬럼 구성(users, brands, user_brand, action_logs, bookmarks, exclude)으로 만든다.
+브랜드 선택은 실제 서비스처럼 인기 브랜드에 몰리도록 Zipf 분포를 따른다.
+'''
+
+def _popularity(n_brands, rng, alpha=1.1):
+    weights = 1.0 / np.arange(1, n_brands + 1) ** alpha
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+def _pick(rng, n_users, per_user_mean, brand_ids, popularity):
+    counts = rng.poisson(per_user_mean, n_users)
+    users = np.repeat(np.arange(1, n_users + 1), counts)
+    brands = rng.choice(brand_ids, size=len(users), p=popularity)
+    return users, brands
+
+def make_synthetic_data(n_users, n_brands=500, n_categories=12, interests_per_user=3, visits_per_user=4,
+                        actions_per_user=20, bookmarks_per_user=2, excludes_per_user=0.3, seed=42):
+    rng = np.random.default_rng(seed)
+    brand_ids = np.arange(1, n_brands + 1)
+    popularity = _popularity(n_brands, rng)
+
+    user_df = pd.DataFrame({
+        "user_id": np.arange(1, n_users + 1),
+        "gender": rng.choice(["MALE", "FEMALE"], n_users),
+        "age_range": rng.choice(["10s", "20s", "30s", "40s", "50s"], n_users),
+    })
+
+    category_ids = rng.integers(1, n_categories + 1, n_brands)
+    brand_df = pd.DataFrame({
+        "brand_id": brand_ids,
+        "brand_name": [f"brand {i} {['cafe', 'food', 'shop', 'culture'][i % 4]}" for i in brand_ids],
+        "category_id": category_ids,
+        "category_name": [f"category_{c}" for c in category_ids],
+    })
+
+    users, brands = _pick(rng, n_users, interests_per_user, brand_ids, popularity)
+    interest = pd.DataFrame({"user_id": users, "brand_id": brands, "data_type": "INTEREST"})
+    users, brands = _pick(rng, n_users, visits_per_user, brand_ids, popularity)
+    recent = pd.DataFrame({"user_id": users, "brand_id": brands, "data_type": "RECENT"})
+    user_brand_df = pd.concat([interest, recent], ignore_index=True).drop_duplicates(ignore_index=True)
+
+    users, brands = _pick(rng, n_users, actions_per_user, brand_ids, popularity)
+    action_logs = pd.DataFrame({
+        "user_id": users,
+        "brand_id": brands,
+        "action_type": rng.choice(["MARKER_CLICK", "FILTER_USED"], len(users), p=[0.7, 0.3]),
+    })
+    interaction_df = aggregate_action_logs(action_logs)
+
+    users, brands = _pick(rng, n_users, bookmarks_per_user, brand_ids, popularity)
+    bookmark_df = pd.DataFrame({"user_id": users, "brand_id": brands})
+
+    users, brands = _pick(rng, n_users, excludes_per_user, brand_ids, popularity)
+    exclude_brand_df = pd.DataFrame({"user_id": users, "brand_id": brands}).drop_duplicates(ignore_index=True)
+
+    return {
+        "user_df": user_df,
+        "brand_df": brand_df,
+        "user_brand_df": user_brand_df,
+        "interaction_df": interaction_df,
+        "bookmark_df": bookmark_df,
+        "exclude_brand_df": exclude_brand_df,
+        "action_logs": action_logs,
+    }
+
+def build_training_inputs(data):
+    # main() 과 같은 순서로 피처/행렬 구성
+    from app.features.builder import build_user_feature_triples, build_item_feature_triples, build_interaction_triples
+    from app.features.matrix import fit_dataset, build_user_feature_matrix, build_item_feature_matrix, build_interaction_matrices
+
+    exclude_brand_ids = set(data["exclude_brand_df"]["brand_id"].tolist())
+    user_feature_triples = build_user_feature_triples(data["user_brand_df"], data["bookmark_df"], data["brand_df"],
+                                                      exclude_brand_ids=exclude_brand_ids)
+    item_feature_triples = build_item_feature_triples(data["brand_df"])
+    dataset = fit_dataset(data["user_df"]["user_id"], data["brand_df"]["brand_id"], user_feature_triples, item_feature_triples)
+    interactions, weights = build_interaction_matrices(
+        dataset, build_interaction_triples(data["interaction_df"], data["user_brand_df"], data["brand_df"])
+    )
+
+    return {
+        "dataset": dataset,
+        "interactions": interactions,
+        "weights": weights,
+        "user_features": build_user_feature_matrix(dataset, user_feature_triples),
+        "item_features": build_item_feature_matrix(dataset, item_feature_triples),
+        "exclude_brand_ids": exclude_brand_ids,
+    }
@@ -0,0 +1,67 @@
+import argparse
+import json
+import time
+from app.config.settings import resolve_num_threads
+from app.model.trainer import train_model
+from benchmarks.synthetic import make_synthetic_data, build_training_inputs
+
+'''
+LightFM 학습 처리량 벤치마크
+합성 데이터 크기(사용자 수)와 스레드 수 조합별로 epochs/sec, interactions/sec 를 측정해 파드 CPU 크기 산정에 사용
+
+    python -m benchmarks.train_throughput --users 1000,10000,100000 --threads 1,2,4,auto --epochs 5
+'''
+
+def _parse_list(value):
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+def run(user_sizes, thread_options, epochs, n_brands, repeat):
+    results = []
+    for n_users in user_sizes:
+        inputs = build_training_inputs(make_synthetic_data(n_users, n_brands=n_brands))
+        n_interactions = inputs["interactions"].nnz
+
+        for option in thread_options:
+            num_threads = resolve_num_threads(option)
+            elapsed = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                train_model(inputs["interactions"], inputs["weights"], inputs["user_features"], inputs["item_features"],
+                            num_threads=num_threads, epochs=epochs)
+                elapsed.append(time.perf_counter() - start)
+
+            best = min(elapsed)
+            result = {
+                "users": n_users,
+                "brands": n_brands,
+                "interactions": n_interactions,
+                "threads": num_threads,
+                "threads_option": option,
+                "epochs": epochs,
+                "seconds": round(best, 4),
+                "epochs_per_sec": round(epochs / best, 3),
+                "interactions_per_sec": round(n_interactions * epochs / best, 1),
+            }
+            results.append(result)
+            print(f"users={n_users:>8} interactions={n_interactions:>10} threads={num_threads:>3} ({option}) "
+                  f"{result['epochs_per_sec']:>8.2f} epochs/s {result['interactions_per_sec']:>14,.0f} interactions/s")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="LightFM 학습 처리량 벤치마크")
+    parser.add_argument("--users", default="1000,10000,50000", help="사용자 수 목록 (쉼표 구분)")
+    parser.add_argument("--threads", default="1,2,4,auto", help="스레드 수 목록 (정수 또는 auto)")
+    parser.add_argument("--brands", type=int, default=500)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=1, help="조합별 반복 횟수 (최솟값 사용)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    results = run([int(u) for u in _parse_list(args.users)], _parse_list(args.threads), args.epochs, args.brands, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
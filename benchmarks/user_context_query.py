@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import event
+from app.config.database import _database_url
+from app.data.loader import (
+    load_user_data,
+    load_brand_data,
+    load_user_brand_data,
+    load_bookmark_data,
+    load_exclude_brands,
+    load_interaction_data,
+    load_user_context,
+)
+from benchmarks.seed_db import DEFAULT_SCHEMA, bench_engine, seed_database
+from benchmarks.synthetic import make_synthetic_data
+
+'''
+사용자 단건 컨텍스트 조회 벤치마크
+기존 경로(사용자/브랜드/관심·방문/즐겨찾기/제외 5개 쿼리)와
+단일 쿼리(load_user_context) + 브랜드 카탈로그 조회 경로의 지연 시간을 로컬 DB 에서 비교한다.
+두 경로의 결과가 같은지도 함께 확인한다.
+로컬 소켓에서는 왕복 비용이 거의 없으므로 --rtt-ms 로 쿼리당 네트워크 왕복 지연을 흉내 낼 수 있다.
+
+    BENCH_DB_URL=postgresql://postgres@localhost:5432/postgres \
+        python -m benchmarks.user_context_query --seed --users 10000 --samples 500
+'''
+
+def five_query_path(conn, user_id):
+    return {
+        "user_df": load_user_data(conn, user_ids=[user_id]),
+        "brand_df": load_brand_data(conn),
+        "user_brand_df": load_user_brand_data(conn, user_ids=[user_id]),
+        "bookmark_df": load_bookmark_data(conn, user_ids=[user_id]),
+        "exclude_brand_df": load_exclude_brands(conn, user_ids=[user_id]),
+    }
+
+def single_query_path(conn, user_id):
+    context = load_user_context(conn, user_id)
+    context["brand_df"] = load_brand_data(conn)
+    return context
+
+def context_only_path(conn, user_id):
+    return load_user_context(conn, user_id)
+
+def _sorted(df):
+    if df.empty:
+        return df.reset_index(drop=True)
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+def check_same_result(conn, user_id):
+    # 행 순서는 쿼리마다 다를 수 있으므로 정렬 후 비교, 인터랙션은 기존 집계 로더와 비교
+    expected = five_query_path(conn, user_id)
+    expected["interaction_df"] = load_interaction_data(conn, user_ids=[user_id])
+    actual = load_user_context(conn, user_id, include_interactions=True)
+    for key in ["user_df", "user_brand_df", "bookmark_df", "exclude_brand_df", "interaction_df"]:
+        pd.testing.assert_frame_equal(_sorted(actual[key]), _sorted(expected[key]), check_dtype=False)
+
+def _install_round_trip_hook(engine, rtt_ms):
+    # 쿼리 실행마다 왕복 횟수를 세고, rtt_ms 가 있으면 그만큼 지연
+    counter = {"queries": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _round_trip(*args):
+        counter["queries"] += 1
+        if rtt_ms:
+            time.sleep(rtt_ms / 1000)
+
+    return counter
+
+def _measure(engine, counter, path, user_ids, warmup):
+    elapsed = []
+    with engine.connect() as conn:
+        for i, user_id in enumerate(user_ids):
+            if i == warmup:
+                counter["queries"] = 0
+            start = time.perf_counter()
+            path(conn, int(user_id))
+            if i >= warmup:
+                elapsed.append((time.perf_counter() - start) * 1000)
+    elapsed = np.array(elapsed)
+    return {
+        "queries_per_request": round(counter["queries"] / len(elapsed), 2),
+        "mean_ms": round(float(elapsed.mean()), 3),
+        "p50_ms": round(float(np.percentile(elapsed, 50)), 3),
+        "p95_ms": round(float(np.percentile(elapsed, 95)), 3),
+        "p99_ms": round(float(np.percentile(elapsed, 99)), 3),
+    }
+
+def run(engine, n_users, samples, warmup, seed, rtt_ms=0.0):
+    rng = np.random.default_rng(seed)
+    # 존재하지 않는 사용자도 일부 포함 (404 경로)
+    user_ids = rng.integers(1, int(n_users * 1.05) + 1, samples + warmup)
+
+    with engine.connect() as conn:
+        for user_id in user_ids[:50]:
+            check_same_result(conn, int(user_id))
+
+    counter = _install_round_trip_hook(engine, rtt_ms)
+    paths = {
+        "five_queries": five_query_path,
+        "single_query_plus_brands": single_query_path,
+        "single_query_only": context_only_path,
+    }
+    results = {}
+    for name, path in paths.items():
+        results[name] = _measure(engine, counter, path, user_ids, warmup)
+        print(f"{name:<26} queries={results[name]['queries_per_request']:<4} mean={results[name]['mean_ms']:>8.3f}ms p50={results[name]['p50_ms']:>8.3f}ms "
+              f"p95={results[name]['p95_ms']:>8.3f}ms p99={results[name]['p99_ms']:>8.3f}ms")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="사용자 컨텍스트 조회 쿼리 벤치마크")
+    parser.add_argument("--db-url", default=os.getenv("BENCH_DB_URL"), help="기본값: BENCH_DB_URL 또는 DB_* 환경변수")
+    parser.add_argument("--schema", default=DEFAULT_SCHEMA, help="벤치마크 데이터를 둘 스키마")
+    parser.add_argument("--seed", action="store_true", help="스키마를 새로 만들고 합성 데이터 적재")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--brands", type=int, default=500)
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="쿼리당 흉내 낼 네트워크 왕복 지연(ms)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    engine = bench_engine(args.db_url or _database_url(), args.schema)
+    if args.seed:
+        counts = seed_database(engine, make_synthetic_data(args.users, n_brands=args.brands), args.schema)
+        print(f"🌱 시딩 완료: {counts}")
+
+    results = run(engine, args.users, args.samples, args.warmup, seed=7, rtt_ms=args.rtt_ms)
+    engine.dispose()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import os
+import asyncio
+import pytest
+import numpy as np
+from sqlalchemy import create_engine
+from app.config import database
+
+'''
+/re-recommendation, /recommendations/{user_id} 비동기 경로 테스트
+
+ASYNC_DB_URL(postgresql+asyncpg://...) 로 지정한 로컬 Postgres 호환 DB 에 벤치마크 스키마(bench)를 만들어
+합성 데이터를 적재하고 배치(main)로 모델/추천 결과를 만든 뒤, 비동기 엔진(run_sync 로더)과 동기 엔진(COPY 저장)을
+함께 쓰는 요청 경로를 동시에 호출한다. ASYNC_DB_URL 이 없으면 건너뛴다.
+'''
+
+ASYNC_DB_URL = os.getenv("ASYNC_DB_URL")
+
+pytestmark = pytest.mark.skipif(not ASYNC_DB_URL, reason="ASYNC_DB_URL 이 설정되지 않음")
+
+httpx = pytest.importorskip("httpx")
+
+N_USERS = 200
+N_BRANDS = 40
+
+
+@pytest.fixture(scope="module")
+def batch(tmp_path_factory):
+    from benchmarks.seed_db import DEFAULT_SCHEMA, bench_engine, seed_database
+    from benchmarks.synthetic import make_synthetic_data
+    import app.main
+    from app.model import store
+
+    sync_url = ASYNC_DB_URL.replace("+asyncpg", "+psycopg2")
+    data = make_synthetic_data(N_USERS, n_brands=N_BRANDS)
+    seed_database(bench_engine(sync_url), data)
+
+    tmp_dir = tmp_path_factory.mktemp("batch")
+    with pytest.MonkeyPatch.context() as mp:
+        # 요청 경로와 같은 풀 구성(동기: TimedQueuePool, 비동기: TimedAsyncQueuePool)을 벤치마크 스키마로 연결
+        mp.setattr(database, "_engine", create_engine(
+            sync_url, poolclass=database.TimedQueuePool, pool_size=1, max_overflow=2,
+            connect_args={"options": f"-csearch_path={DEFAULT_SCHEMA}"},
+        ))
+        mp.setattr(store, "MODEL_DIR", str(tmp_dir / "model"))
+        mp.setattr(app.main, "BATCH_REPORT_DIR", str(tmp_dir / "reports"))
+        mp.setattr(app.main, "EARLY_STOPPING", False)
+        result = app.main.main()
+        yield {"data": data, "result": result, "schema": DEFAULT_SCHEMA}
+        database._engine.dispose()
+
+
+def _async_engine(schema):
+    # asyncpg 커넥션은 이벤트 루프에 묶이므로 테스트 루프 안에서 만들고 닫음
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    return create_async_engine(ASYNC_DB_URL, poolclass=database.TimedAsyncQueuePool, pool_size=2, max_overflow=2,
+                               connect_args={"server_settings": {"search_path": schema}})
+
+
+def _run(batch, scenario):
+    from app.server import app
+
+    async def main():
+        engine = _async_engine(batch["schema"])
+        database._async_engine = engine
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await scenario(client)
+        finally:
+            database._async_engine = None
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_re_recommendation_concurrent_requests(batch):
+    user_ids = batch["data"]["user_df"]["user_id"].head(8).tolist()
+    checkouts_before = database.async_pool_stats.checkouts
+
+    async def scenario(client):
+        responses = await asyncio.gather(*[client.post("/re-recommendation", json={"user_id": user_id})
+                                           for user_id in user_ids])
+        # 저장(동기 풀) 이후 조회(비동기 풀)에서 같은 결과가 보여야 함
+        stored = await asyncio.gather(*[client.get(f"/recommendations/{user_id}") for user_id in user_ids])
+        return responses, stored
+
+    responses, stored = _run(batch, scenario)
+
+    for user_id, response, saved in zip(user_ids, responses, stored):
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert body["user_id"] == user_id
+        assert [r["rank"] for r in body["recommendations"]] == list(range(1, 6))
+        assert saved.status_code == 200
+        assert [r["brand_id"] for r in saved.json()["recommendations"]] == [r["brand_id"] for r in body["recommendations"]]
+        assert np.allclose([r["score"] for r in saved.json()["recommendations"]],
+                           [r["score"] for r in body["recommendations"]])
+
+    # 요청 경로의 조회는 계측된 비동기 풀을 사용
+    assert database.async_pool_stats.checkouts > checkouts_before
+    assert database.async_pool_stats.timeouts == 0
+
+
+def test_unknown_user_returns_404(batch):
+    async def scenario(client):
+        return (await client.post("/re-recommendation", json={"user_id": -12345}),
+                await client.get("/recommendations/-12345"))
+
+    re_recommendation, stored = _run(batch, scenario)
+    assert re_recommendation.status_code == 404
+    assert stored.status_code == 404